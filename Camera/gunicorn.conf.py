@@ -0,0 +1,16 @@
+# Gunicorn settings for web.py, used by the Docker image:
+#   gunicorn -c gunicorn.conf.py web:app
+
+bind = '0.0.0.0:5001'
+
+# The camera can only be opened by one process, so a single worker serves
+# everything. Each stream client gets one of its threads.
+workers = 1
+worker_class = 'gthread'
+threads = 16
+
+
+def post_worker_init(worker):
+    # Start the capture thread inside the worker that owns the camera
+    from web import start_background_tasks
+    start_background_tasks()
@@ -2,54 +2,194 @@ from flask import Flask, render_template, Response, request, redirect, url_for,
 import cv2
 import threading
 import os
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from azure.storage.blob import BlobServiceClient
+from azure.storage.blob import BlobServiceClient, BlobBlock
+
+try:
+    # libjpeg-turbo with NEON/SIMD, several times faster than cv2.imencode
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420
+    turbo_jpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    turbo_jpeg = None
+    print("PyTurboJPEG or libturbojpeg not found. Falling back to cv2.imencode.")
 
 app = Flask(__name__)
 
+class FrameRing:
+    """
+    Small ring of the most recent multipart JPEG chunks.
+
+    The capture thread is the only writer. Stream clients never take a lock
+    to read a frame, they only wait for the head counter to move.
+    """
+    SIZE = 4  # must be a power of two
+
+    def __init__(self):
+        self._slots = [None] * self.SIZE
+        self._head = 0
+        self._new_frame = threading.Condition()
+
+    def publish(self, frame):
+        """Store a frame and wake every waiting client."""
+        self._slots[self._head & (self.SIZE - 1)] = frame
+        self._head += 1
+        with self._new_frame:
+            self._new_frame.notify_all()
+
+    def wait_next(self, seen, timeout=1.0):
+        """
+        Wait for a frame newer than head `seen`.
+        Returns (head, frame), frame is None if nothing arrived before the timeout.
+        """
+        if self._head == seen:
+            with self._new_frame:
+                self._new_frame.wait_for(lambda: self._head != seen, timeout)
+        head = self._head
+        if head == seen:
+            return head, None
+        return head, self._slots[(head - 1) & (self.SIZE - 1)]
+
 # Azure Blob Storage configuration
 #connection_string = "DefaultEnxxxxxxxxxxxx"  # Replace with your Azure storage connection string
 container_name = "video-uploads"  # Replace with your Azure Blob Storage container name
 blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+# Recordings larger than the threshold are uploaded as staged blocks
+UPLOAD_BLOCK_SIZE = 8 * 1024 * 1024
+UPLOAD_WORKERS = 4
+UPLOAD_CHUNKED_THRESHOLD = 64 * 1024 * 1024
 
 # Global variables
-video_stream = cv2.VideoCapture(0)
-output_frame = None
-lock = threading.Lock()
+video_stream = cv2.VideoCapture(0, cv2.CAP_V4L2)
+# Ask the camera for MJPEG and hand us its compressed buffers as-is, so the
+# live feed never has to decode and re-encode frames on the CPU. Only done if
+# the camera really switched to MJPG, otherwise OpenCV keeps converting to BGR
+MJPG_FOURCC = cv2.VideoWriter_fourcc(*'MJPG')
+video_stream.set(cv2.CAP_PROP_FOURCC, MJPG_FOURCC)
+MJPEG_PASSTHROUGH = int(video_stream.get(cv2.CAP_PROP_FOURCC)) == MJPG_FOURCC
+if MJPEG_PASSTHROUGH:
+    video_stream.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+# Fallback preview encoding for cameras without MJPEG: downscaled and with
+# the cheap libjpeg settings, recordings keep the full resolution
+PREVIEW_WIDTH = 640
+JPEG_QUALITY = 72
+JPEG_PARAMS = [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY,
+               int(cv2.IMWRITE_JPEG_OPTIMIZE), 0,
+               int(cv2.IMWRITE_JPEG_PROGRESSIVE), 0]
+# Multipart part header, Content-Length lets clients read the JPEG without
+# scanning for the boundary
+FRAME_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n'
+# Fallback encodes run on a few worker threads (cv2.resize and cv2.imencode
+# drop the GIL), so several frames are compressed in parallel on the Pi's cores
+ENCODE_WORKERS = 3
+encode_pool = ThreadPoolExecutor(max_workers=ENCODE_WORKERS)
+frame_ring = FrameRing()
+record_lock = threading.Lock()
 recording = False
 paused = False
-video_writer = None
+video_proc = None
 video_filename = ""
 
+def start_recorder(file_name, frame_size, fps=20.0):
+    # Pipe raw BGR frames into ffmpeg and let the Pi's V4L2 M2M hardware
+    # encoder do the H.264 compression off the CPU
+    width, height = frame_size
+    command = [
+        'ffmpeg', '-loglevel', 'error', '-y',
+        '-f', 'rawvideo', '-pix_fmt', 'bgr24',
+        '-s', f'{width}x{height}', '-r', str(fps),
+        '-i', '-',
+        '-c:v', 'h264_v4l2m2m', '-pix_fmt', 'yuv420p',
+        '-f', 'mp4', file_name,
+    ]
+    # Only errors are logged, so stderr stays small and is read once ffmpeg exits
+    return subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+def stop_recorder(proc):
+    # Closing stdin lets ffmpeg flush and finalise the mp4. If ffmpeg already
+    # died the pipe is broken, log why instead of raising
+    try:
+        _, errors = proc.communicate()
+    except OSError:
+        proc.kill()
+        proc.wait()
+        errors = b''
+    if proc.returncode != 0:
+        print(f"ffmpeg exited with code {proc.returncode}: {errors.decode(errors='replace').strip()}")
+
+def encode_preview(bgr):
+    preview = bgr
+    height, width = bgr.shape[:2]
+    if width > PREVIEW_WIDTH:
+        preview_size = (PREVIEW_WIDTH, height * PREVIEW_WIDTH // width)
+        preview = cv2.resize(bgr, preview_size, interpolation=cv2.INTER_AREA)
+    if turbo_jpeg is not None:
+        return turbo_jpeg.encode(preview, quality=JPEG_QUALITY,
+                                 pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420)
+    ret, jpeg = cv2.imencode('.jpg', preview, JPEG_PARAMS)
+    return jpeg
+
+def publish_jpeg(jpeg):
+    # Build the multipart chunk once here as a single bytes object, every
+    # client sends the same bytes with one send() per frame
+    frame_ring.publish(b''.join((FRAME_HEADER % len(jpeg), jpeg, b'\r\n')))
+
 def generate_frames():
-    global output_frame, lock, video_writer, recording, paused
+    global video_proc, recording, paused
+    # Fallback encodes in flight, oldest first. Finished ones are published
+    # from this thread in capture order, so the ring keeps a single writer
+    pending = deque()
 
     while True:
         success, frame = video_stream.read()
         if not success:
             break
 
-        with lock:
-            output_frame = frame.copy()
+        # VideoCapture.read() hands back a freshly allocated array every time,
+        # so its buffer is used directly instead of being copied to bytes
+        if MJPEG_PASSTHROUGH and (frame.ndim == 1 or frame.shape[0] == 1):
+            # Camera delivered MJPEG as a 1xN buffer: it already is the JPEG
+            jpeg = frame.reshape(-1)
+            bgr = None
+        else:
+            # Camera ignored the MJPG request, fall back to encoding on the pool
+            bgr = frame
+            jpeg = None
+            if len(pending) >= ENCODE_WORKERS:
+                # Every worker is busy, wait for the oldest frame
+                publish_jpeg(pending.popleft().result())
+            pending.append(encode_pool.submit(encode_preview, bgr))
 
-            if recording and not paused:
-                if video_writer is not None:
-                    video_writer.write(frame)
+        if jpeg is not None:
+            publish_jpeg(jpeg)
+        while pending and pending[0].done():
+            publish_jpeg(pending.popleft().result())
 
-        # Sleep for a short period to reduce CPU usage
-        cv2.waitKey(1)
+        with record_lock:
+            if recording and not paused:
+                if video_proc is not None:
+                    # Only the recording path needs decoded pixels
+                    if bgr is None:
+                        bgr = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+                    try:
+                        video_proc.stdin.write(bgr.data)  # no intermediate copy
+                    except OSError:
+                        # ffmpeg is gone, stop recording but keep the live feed running
+                        print("Recorder stopped unexpectedly, recording ended.")
+                        recording = False
+                        paused = False
+                        stop_recorder(video_proc)
+                        video_proc = None
 
 def encode_frame():
-    global output_frame, lock
-
+    head = 0
     while True:
-        with lock:
-            if output_frame is None:
-                continue
-            ret, buffer = cv2.imencode('.jpg', output_frame)
-            frame = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+        head, chunk = frame_ring.wait_next(head)
+        if chunk is None:
+            continue
+        yield chunk
 
 @app.route('/')
 def index():
@@ -61,18 +201,16 @@ def video_feed():
 
 @app.route('/control', methods=['POST'])
 def control():
-    global recording, paused, video_writer, video_filename
+    global recording, paused, video_proc, video_filename
 
     action = request.form.get('action')
 
     if action == 'record':
         if not recording:
             video_filename = f"recorded_stream_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            fps = 20.0
             frame_size = (int(video_stream.get(cv2.CAP_PROP_FRAME_WIDTH)),
                           int(video_stream.get(cv2.CAP_PROP_FRAME_HEIGHT)))
-            video_writer = cv2.VideoWriter(video_filename, fourcc, fps, frame_size)
+            video_proc = start_recorder(video_filename, frame_size)
             recording = True
             paused = False
             return jsonify(status='Recording started')
@@ -89,11 +227,13 @@ def control():
 
     elif action == 'stop':
         if recording:
-            recording = False
-            paused = False
-            if video_writer is not None:
-                video_writer.release()
-                video_writer = None
+            with record_lock:
+                recording = False
+                paused = False
+                proc = video_proc
+                video_proc = None
+            if proc is not None:
+                stop_recorder(proc)
             # Start upload in a separate thread
             threading.Thread(target=upload_to_azure, args=(video_filename,)).start()
             return jsonify(status='Recording stopped and upload started')
@@ -103,6 +243,25 @@ def control():
     else:
         return jsonify(status='Invalid action')
 
+def upload_in_blocks(blob_client, file_name):
+    # Every worker preads its own block and stages it, so disk reads overlap
+    # with network sends and at most UPLOAD_WORKERS blocks sit in memory
+    num_blocks = -(-os.path.getsize(file_name) // UPLOAD_BLOCK_SIZE)
+    fd = os.open(file_name, os.O_RDONLY)
+
+    def stage(index):
+        data = os.pread(fd, UPLOAD_BLOCK_SIZE, index * UPLOAD_BLOCK_SIZE)
+        block_id = f"{index:08d}"
+        blob_client.stage_block(block_id, data)
+        return BlobBlock(block_id=block_id)
+
+    try:
+        with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+            block_list = list(pool.map(stage, range(num_blocks)))
+    finally:
+        os.close(fd)
+    blob_client.commit_block_list(block_list)
+
 def upload_to_azure(file_name):
     blob_name = f"videos/{file_name}"
     container_client = blob_service_client.get_container_client(container_name)
@@ -121,8 +280,11 @@ def upload_to_azure(file_name):
     blob_client = container_client.get_blob_client(blob=blob_name)
 
     try:
-        with open(file_name, "rb") as data:
-            blob_client.upload_blob(data, overwrite=True)
+        if os.path.getsize(file_name) > UPLOAD_CHUNKED_THRESHOLD:
+            upload_in_blocks(blob_client, file_name)
+        else:
+            with open(file_name, "rb") as data:
+                blob_client.upload_blob(data, overwrite=True)
         print(f"Successfully uploaded {file_name} to Azure Blob Storage as {blob_name}")
     except Exception as e:
         print(f"Failed to upload {file_name} to Azure: {e}")
@@ -1,14 +1,14 @@
+import json
+import os
+import socket
 import time
-import board
-import digitalio
-import adafruit_ssd1306
-from PIL import Image, ImageDraw, ImageFont
+import threading
+import numpy as np
 from hx711 import HX711
 
-# OLED setup
-RESET_PIN = digitalio.DigitalInOut(board.D4)
-i2c = board.I2C()
-oled = adafruit_ssd1306.SSD1306_I2C(128, 64, i2c, addr=0x3D, reset=RESET_PIN)
+# The OLED is owned by the OLED service (Oled/oled_service.py), weights are sent to its socket
+OLED_SOCKET = os.environ.get('OLED_SOCKET', '/tmp/oled/oled.sock')
+oled_socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
 
 # Load known reference values
 ZERO_VALUE = 8388608  # Use your obtained zero value here
@@ -20,38 +20,49 @@ hx.set_gain(128)    # Set gain for channel A
 hx.set_offset(ZERO_VALUE)  # Set the zero value obtained during calibration
 hx.set_scale(REFERENCE_UNIT)  # Set the scale factor (to be determined)
 
-# Function to clear the OLED display
-def clear_display():
-    oled.fill(0)
-    oled.show()
+# Raw ADC counts collected by the reader thread, newest overwrites oldest
+SAMPLE_COUNT = 64
+samples = np.zeros(SAMPLE_COUNT, dtype=np.int32)
+samples_taken = 0
 
-# Function to update the display with the current weight
-def update_display(weight):
-    width = oled.width
-    height = oled.height
-    image = Image.new("1", (width, height))
-    draw = ImageDraw.Draw(image)
+def read_samples():
+    global samples_taken
+    while True:
+        samples[samples_taken % SAMPLE_COUNT] = hx.read()
+        samples_taken += 1
 
-    font = ImageFont.load_default()
-    weight_str = f"Weight: {weight:.2f} g"
+def get_weight():
+    # Median over the filled part of the buffer filters out single spikes
+    filled = min(samples_taken, SAMPLE_COUNT)
+    if filled == 0:
+        return None
+    return (np.median(samples[:filled]) - hx.get_offset()) / hx.get_scale()
 
-    # Use textbbox to calculate text width and height
-    bbox = draw.textbbox((0, 0), weight_str, font)
-    text_width, text_height = bbox[2] - bbox[0], bbox[3] - bbox[1]
+last_weight_str = None
 
-    # Center the text on the screen
-    x_pos = (width - text_width) // 2
-    y_pos = (height - text_height) // 2
-    draw.text((x_pos, y_pos), weight_str, font=font, fill=255)
+# Function to update the display with the current weight
+def update_display(weight):
+    global last_weight_str
+    weight_str = f"{weight:.2f}"
+    if weight_str == last_weight_str:
+        return  # nothing visible changed, don't bother the display
+    try:
+        oled_socket.sendto(json.dumps(['weight', weight]).encode(), OLED_SOCKET)
+        last_weight_str = weight_str
+    except (FileNotFoundError, ConnectionRefusedError):
+        pass  # OLED service not running (yet), try again with the next reading
 
-    oled.image(image)
-    oled.show()
+# Sample the load cell in the background so the display loop never waits on the ADC
+threading.Thread(target=read_samples, daemon=True).start()
 
 # Main loop for reading and displaying the weight
 while True:
     try:
         # Get weight from the load cell
-        raw_value = hx.get_grams()  # Get the weight in grams
+        raw_value = get_weight()  # Get the weight in grams
+        if raw_value is None:
+            time.sleep(0.1)
+            continue
         print(f"Weight: {raw_value:.2f} grams")  # Print the raw value (for debugging)
 
         # Update the OLED display
@@ -103,11 +103,11 @@ class HX711:
         :return reading from the HX711
         """
 
-        # Control if the chip is ready
+        # Control if the chip is ready. Instead of spinning on DOUT, sleep in
+        # the kernel until it falls; the timeout covers an edge that happens
+        # between the check and the wait
         while not (GPIO.input(self.DOUT) == 0):
-            # Uncommenting the print below results in noisy output
-            # print("No input from HX711.")
-            pass
+            GPIO.wait_for_edge(self.DOUT, GPIO.FALLING, timeout=200)
 
         # Original C source code ported to Python as described in datasheet
         # https://cdn.sparkfun.com/datasheets/Sensors/ForceFlex/hx711_english.pdf
@@ -1,143 +1,109 @@
-import subprocess
 import os
-import board
-import digitalio
-import adafruit_ssd1306
-from PIL import Image, ImageDraw, ImageFont
-from time import sleep, time
+import selectors
+import signal
+import socket
+import sys
+from pyroute2 import IPRoute, IW, NetlinkError
+from pyroute2.netlink.rtnl import RTMGRP_LINK, RTMGRP_IPV4_IFADDR, RTMGRP_IPV4_ROUTE
+from time import time
+from oled_service import OledService
 
-FONT_PATH = '/home/savonia/Music/Excavator/misc/oled/Montserrat-VariableFont_wght.ttf'
 TIME_DELAY = 5  # switch between screens every 5 seconds
 
 
-# OLED setup
-RESET_PIN = digitalio.DigitalInOut(board.D4)
-i2c = board.I2C()
-oled = adafruit_ssd1306.SSD1306_I2C(128, 64, i2c, addr=0x3D, reset=RESET_PIN)
+# The display itself is owned by the OLED service, this script feeds it network status
+service = OledService()
+service.start()
 
-def clear_display():
-    oled.fill(0)
-    oled.show()
+# Netlink sockets are opened once and reused for every query
+ipr = IPRoute()
+try:
+    iw = IW()
+except (NetlinkError, OSError):
+    iw = None  # no nl80211 support, so no wireless details
+
+# Separate socket subscribed to link, address and route changes. The main
+# loop sleeps on it and only wakes when the network actually changes.
+netlink_events = IPRoute()
+netlink_events.bind(groups=RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE)
+selector = selectors.DefaultSelector()
+selector.register(netlink_events.fileno(), selectors.EVENT_READ)
 
 def get_active_interface():
     try:
-        cmd = "ip route get 1.1.1.1 | awk '{print $5}' | head -n 1"
-        interface = subprocess.check_output(cmd, shell=True).decode("utf-8").strip()
-        return interface
-    except subprocess.CalledProcessError:
-        return None
+        ifindex = ipr.route('get', dst='1.1.1.1')[0].get_attr('RTA_OIF')
+        interface = ipr.link('get', index=ifindex)[0].get_attr('IFLA_IFNAME')
+        return ifindex, interface
+    except (NetlinkError, IndexError):
+        return None, None
 
-def get_ip_address(interface):
+def get_ip_address(ifindex):
     try:
-        cmd = f"ip addr show {interface} | grep 'inet ' | awk '{{print $2}}' | cut -d'/' -f1"
-        IP = subprocess.check_output(cmd, shell=True).decode("utf-8").strip()
-        return IP
-    except subprocess.CalledProcessError:
+        return ipr.get_addr(index=ifindex, family=socket.AF_INET)[0].get_attr('IFA_ADDRESS')
+    except (NetlinkError, IndexError):
         return "No IP Found"
 
-def get_ssid(interface):
+def get_ssid(ifindex):
     try:
-        cmd = f"iwgetid -r {interface}"
-        SSID = subprocess.check_output(cmd, shell=True).decode("utf-8").strip()
-        return SSID
-    except subprocess.CalledProcessError:
+        SSID = iw.get_interface_by_ifindex(ifindex)[0].get_attr('NL80211_ATTR_SSID')
+        return SSID or "Not Connected"
+    except (NetlinkError, IndexError, AttributeError):
         return "Not Connected"
 
-def get_rssi(interface):
+def get_rssi(ifindex):
     try:
-        cmd = f"iwconfig {interface} | grep 'Signal level' | awk '{{print $4}}' | cut -d'=' -f2"
-        rssi = subprocess.check_output(cmd, shell=True).decode("utf-8").strip()
-        return int(rssi)
-    except subprocess.CalledProcessError:
-        return None
+        for station in iw.get_stations(ifindex):
+            return station.get_attr('NL80211_ATTR_STA_INFO').get_attr('NL80211_STA_INFO_SIGNAL')
+    except (NetlinkError, AttributeError):
+        pass
+    return None
+
+def get_network_status():
+    ifindex, interface = get_active_interface()
+    if interface is None:
+        return "", "NONE", "", None
+    if "wlan" in interface:
+        return interface, get_ip_address(ifindex), get_ssid(ifindex), get_rssi(ifindex)
+    return interface, get_ip_address(ifindex), "Wired", None
+
+# The thermal zone is opened once and re-read from offset 0 on every call
+try:
+    TEMP_FD = os.open('/sys/class/thermal/thermal_zone0/temp', os.O_RDONLY)
+except OSError:
+    TEMP_FD = None
+
+def close_on_sigterm(signum, frame):
+    if TEMP_FD is not None:
+        os.close(TEMP_FD)
+    sys.exit(0)
+
+signal.signal(signal.SIGTERM, close_on_sigterm)
 
 def get_cpu_temperature():
+    if TEMP_FD is None:
+        return None
     try:
-        with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-            temp_str = f.read().strip()
-            temp = float(temp_str) / 1000.0  # Convert from millidegree Celsius to Celsius
-            return temp
-    except IOError:
+        return int(os.pread(TEMP_FD, 16, 0).strip()) / 1000.0  # Convert from millidegree Celsius to Celsius
+    except (OSError, ValueError):
         return None
 
-def draw_wifi_signal(draw, rssi, x, y):
-    if rssi is None:
-        return
-
-    bars = 0
-    if rssi > -50:
-        bars = 3
-    elif rssi > -60:
-        bars = 2
-    elif rssi > -70:
-        bars = 1
-
-    bar_width = 5
-    bar_height = 3
-    spacing = 2
-
-    for i in range(bars):
-        draw.rectangle((x, y - i * (bar_height + spacing), x + bar_width, y - i * (bar_height + spacing) + bar_height), outline=255, fill=255)
-
-def update_display(interface, network_name, IP, rssi=None, show_cpu_temp=False):
-    width = oled.width
-    height = oled.height
-    image = Image.new("1", (width, height))
-    draw = ImageDraw.Draw(image)
-
-    font_size = 12
-    font_size_ip = 19
-    font_savonia = ImageFont.truetype(FONT_PATH, font_size)
-    font_savonia_ip = ImageFont.truetype(FONT_PATH, font_size_ip)
-
-    if show_cpu_temp:
-        cpu_temp = get_cpu_temperature()
-        if cpu_temp is not None:
-            cpu_temp_str = f"CPU: {cpu_temp:.0f}C"
-            cpu_temp_width = draw.textlength(cpu_temp_str, font=font_savonia)
-            cpu_temp_x = (width - cpu_temp_width) // 2
-            draw.text((cpu_temp_x, 0), cpu_temp_str, font=font_savonia, fill=255)
-    else:
-        network_label = "SSID:" if "wlan" in interface else "Network:"
-        network_label_width = draw.textlength(network_label, font=font_savonia)
-        network_label_x = (width - network_label_width) // 2
-        draw.text((network_label_x, 0), network_label, font=font_savonia, fill=255)
-
-    network_name_width = draw.textlength(network_name, font=font_savonia)
-    IP_width = draw.textlength(IP, font=font_savonia_ip)
-
-    network_name_x = (width - network_name_width) // 2
-    IP_x = (width - IP_width) // 2
-
-    draw.text((network_name_x, 16), network_name, font=font_savonia, fill=255)
-    draw.text((IP_x, 32), IP, font=font_savonia_ip, fill=255)
-    draw.line((0, 14, width, 14), fill=255)
-
-    if rssi:
-        draw_wifi_signal(draw, rssi, width - 10, 10)
-
-    oled.image(image)
-    oled.show()
-
-clear_display()
-
 previous_network_name, previous_IP, previous_rssi = None, None, None
 toggle_display = False
 last_toggle_time = time()
 
 while True:
-    current_time = time()
-    if current_time - last_toggle_time >= TIME_DELAY:
-        toggle_display = not toggle_display
-        last_toggle_time = current_time
-
-    interface = get_active_interface()
-    IP = get_ip_address(interface) if interface else "NONE"
-    network_name = get_ssid(interface) if "wlan" in interface else "Wired" if interface else ""
-    rssi = get_rssi(interface) if "wlan" in interface else None
+    interface, IP, network_name, rssi = get_network_status()
 
     if network_name != previous_network_name or IP != previous_IP or (rssi and previous_rssi != rssi) or toggle_display != previous_toggle_display:
-        update_display(interface, network_name, IP, rssi, show_cpu_temp=toggle_display)
+        cpu_temp = get_cpu_temperature() if toggle_display else None
+        service.submit('net', interface, network_name, IP, rssi, cpu_temp)
         previous_network_name, previous_IP, previous_rssi, previous_toggle_display = network_name, IP, rssi, toggle_display
 
-    sleep(1)
+    # Sleep until the network changes or it is time to switch screens.
+    # The periodic wakeup also refreshes the Wi-Fi signal level.
+    timeout = max(0.0, TIME_DELAY - (time() - last_toggle_time))
+    if selector.select(timeout=timeout):
+        netlink_events.get()  # consume the queued change messages
+    else:
+        toggle_display = not toggle_display
+        last_toggle_time = time()
@@ -0,0 +1,304 @@
+"""
+Single owner of the SSD1306 OLED display.
+
+The network status screen (oled.py) and the load cell weight (Load_cell/final1.py)
+used to open the same display at 0x3D from their own processes, clobbering each
+other's frames and competing on the I2C bus. Now only this service talks to the
+display. Producers submit what they want to show, and the service thread
+composites everything into one framebuffer and sends only the changed part.
+
+Messages:
+- ('net', interface, network_name, IP, rssi, cpu_temp)  cpu_temp is None on the network screen
+- ('weight', grams)
+
+Producers in the same process call submit(). Producers in other processes or
+containers send the same messages as JSON datagrams to OLED_SOCKET, see send().
+
+The module is fully annotated so it can be compiled with mypyc
+(`mypyc oled_service.py`). Python imports the built extension in place of this
+file, delete the .so to go back to the pure-Python version.
+"""
+
+import json
+import math
+import os
+import queue
+import socket
+import threading
+from typing import Optional, Tuple
+import board
+import digitalio
+import adafruit_ssd1306
+from PIL import Image, ImageDraw, ImageFont
+
+FONT_PATH = '/home/savonia/Music/Excavator/misc/oled/Montserrat-VariableFont_wght.ttf'
+OLED_SOCKET = os.environ.get('OLED_SOCKET', '/tmp/oled/oled.sock')
+
+WIDTH = 128
+HEIGHT = 64
+PAGES = HEIGHT // 8
+SET_COL_ADDR = 0x21
+SET_PAGE_ADDR = 0x22
+
+# Fonts are loaded once, FreeType face setup is the slowest part of a redraw
+FONT_SMALL = ImageFont.truetype(FONT_PATH, 12)
+FONT_IP = ImageFont.truetype(FONT_PATH, 19)
+FONT_WEIGHT = ImageFont.load_default()
+
+
+def make_background(label: Optional[str] = None) -> Image.Image:
+    # Static part of a screen: the divider line and an optional centered label
+    image = Image.new("1", (WIDTH, HEIGHT))
+    draw = ImageDraw.Draw(image)
+    if label is not None:
+        label_width = draw.textlength(label, font=FONT_SMALL)
+        draw.text(((WIDTH - label_width) // 2, 0), label, font=FONT_SMALL, fill=255)
+    draw.line((0, 14, WIDTH, 14), fill=255)
+    return image
+
+
+BG_SSID = make_background("SSID:")
+BG_NETWORK = make_background("Network:")
+BG_CPU = make_background()
+BG_BLANK = Image.new("1", (WIDTH, HEIGHT))
+
+# Signal strength icons for 0-3 bars, rendered once and pasted as a whole
+WIFI_BAR_WIDTH = 5
+WIFI_BAR_HEIGHT = 3
+WIFI_BAR_SPACING = 2
+WIFI_MAX_BARS = 3
+WIFI_ICON_TOP = (WIFI_MAX_BARS - 1) * (WIFI_BAR_HEIGHT + WIFI_BAR_SPACING)
+
+
+def make_wifi_icon(bars: int) -> Image.Image:
+    image = Image.new("1", (WIFI_BAR_WIDTH + 1, WIFI_ICON_TOP + WIFI_BAR_HEIGHT + 1))
+    draw = ImageDraw.Draw(image)
+    for i in range(bars):
+        top = WIFI_ICON_TOP - i * (WIFI_BAR_HEIGHT + WIFI_BAR_SPACING)
+        draw.rectangle((0, top, WIFI_BAR_WIDTH, top + WIFI_BAR_HEIGHT), outline=255, fill=255)
+    return image
+
+
+WIFI_ICONS = [make_wifi_icon(bars) for bars in range(WIFI_MAX_BARS + 1)]
+
+
+def render_tile(text: str) -> Tuple[Image.Image, int]:
+    # Render text once into its own 1-bit tile, returns (tile, advance width)
+    bbox = FONT_WEIGHT.getbbox(text)
+    tile = Image.new("1", (max(int(bbox[2]), 1), max(int(bbox[3]), 1)))
+    ImageDraw.Draw(tile).text((0, 0), text, font=FONT_WEIGHT, fill=255)
+    return tile, round(FONT_WEIGHT.getlength(text))
+
+
+# Weight strip along the bottom edge, only the number changes. Every
+# character of the number gets a cell of the same width, so the layout only
+# depends on the string length and x positions come from a lookup table.
+GLYPHS = {ch: render_tile(ch) for ch in "0123456789.-"}
+PREFIX = render_tile("Weight: ")
+SUFFIX = render_tile(" g")
+CELL_WIDTH = max(advance for _, advance in GLYPHS.values())
+WEIGHT_BBOX = FONT_WEIGHT.getbbox("Weight: 0123456789.- g")
+WEIGHT_Y = HEIGHT - int(WEIGHT_BBOX[3])
+WEIGHT_MAX_CHARS = (WIDTH - PREFIX[1] - SUFFIX[1]) // CELL_WIDTH
+WEIGHT_X = [(WIDTH - PREFIX[1] - length * CELL_WIDTH - SUFFIX[1]) // 2
+            for length in range(WEIGHT_MAX_CHARS + 1)]
+
+
+def draw_wifi_signal(image: Image.Image, rssi: Optional[int], x: int, y: int) -> None:
+    if rssi is None:
+        return
+
+    bars: int = 0
+    if rssi > -50:
+        bars = 3
+    elif rssi > -60:
+        bars = 2
+    elif rssi > -70:
+        bars = 1
+
+    # (x, y) is the top left corner of the lowest bar, the icon grows upwards
+    image.paste(WIFI_ICONS[bars], (x, y - WIFI_ICON_TOP), WIFI_ICONS[bars])
+
+
+def draw_network(image: Image.Image, interface: str, network_name: str, IP: str,
+                 rssi: Optional[int] = None, cpu_temp: Optional[float] = None) -> None:
+    draw = ImageDraw.Draw(image)
+
+    if cpu_temp is not None:
+        cpu_temp_str = f"CPU: {cpu_temp:.0f}C"
+        cpu_temp_width = draw.textlength(cpu_temp_str, font=FONT_SMALL)
+        cpu_temp_x = (WIDTH - cpu_temp_width) // 2
+        draw.text((cpu_temp_x, 0), cpu_temp_str, font=FONT_SMALL, fill=255)
+
+    network_name_width = draw.textlength(network_name, font=FONT_SMALL)
+    IP_width = draw.textlength(IP, font=FONT_IP)
+
+    network_name_x = (WIDTH - network_name_width) // 2
+    IP_x = (WIDTH - IP_width) // 2
+
+    draw.text((network_name_x, 16), network_name, font=FONT_SMALL, fill=255)
+    draw.text((IP_x, 32), IP, font=FONT_IP, fill=255)
+
+    if rssi:
+        draw_wifi_signal(image, rssi, WIDTH - 10, 10)
+
+
+def draw_weight(image: Image.Image, weight_str: str) -> None:
+    weight_str = weight_str[:WEIGHT_MAX_CHARS]
+
+    # Centered position for this many characters, precomputed
+    x_pos: int = WEIGHT_X[len(weight_str)]
+    image.paste(PREFIX[0], (x_pos, WEIGHT_Y), PREFIX[0])
+    x_pos += PREFIX[1]
+    for ch in weight_str:
+        tile, advance = GLYPHS[ch]
+        # Narrow glyphs like '.' sit in the middle of their cell
+        image.paste(tile, (x_pos + (CELL_WIDTH - advance) // 2, WEIGHT_Y), tile)
+        x_pos += CELL_WIDTH
+    image.paste(SUFFIX[0], (x_pos, WEIGHT_Y), SUFFIX[0])
+
+
+def send(*message: object, socket_path: str = OLED_SOCKET) -> bool:
+    """
+    Submit a message from another process. Returns False if the service is not running.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        try:
+            sock.sendto(json.dumps(message).encode(), socket_path)
+            return True
+        except (FileNotFoundError, ConnectionRefusedError):
+            return False
+
+
+class OledService:
+    """
+    Owns the display and redraws it from the latest state of every producer.
+    """
+
+    def __init__(self, socket_path: str = OLED_SOCKET) -> None:
+        reset_pin = digitalio.DigitalInOut(board.D4)
+        i2c = board.I2C()
+        self.oled = adafruit_ssd1306.SSD1306_I2C(WIDTH, HEIGHT, i2c, addr=0x3D, reset=reset_pin)
+        self.socket_path = socket_path
+        self.render_queue: queue.Queue[tuple] = queue.Queue()
+
+        self._net: Optional[tuple] = None
+        self._weight_str: Optional[str] = None
+        self._previous_buffer: Optional[bytes] = None
+
+        self._render_thread = threading.Thread(target=self._render_loop, daemon=True)
+        self._socket_thread = threading.Thread(target=self._socket_loop, daemon=True)
+
+    def start(self) -> None:
+        """Clear the display and start the render and socket threads."""
+        self.oled.fill(0)
+        self.oled.show()
+        self._render_thread.start()
+        self._socket_thread.start()
+
+    def submit(self, *message: object) -> None:
+        """Queue a ('net', ...) or ('weight', grams) message for display."""
+        self.render_queue.put(message)
+
+    def _apply(self, message: tuple) -> bool:
+        # Returns True if the message changed what is on screen
+        kind, *payload = message
+        if kind == 'net' and len(payload) == 5:
+            net = tuple(payload)
+            changed, self._net = net != self._net, net
+            return changed
+        if kind == 'weight' and len(payload) == 1 and isinstance(payload[0], (int, float)) \
+                and math.isfinite(payload[0]):
+            weight_str = f"{payload[0]:.2f}"
+            changed, self._weight_str = weight_str != self._weight_str, weight_str
+            return changed
+        print(f"[OLED] Ignoring unknown message: {message}")
+        return False
+
+    def _render_loop(self) -> None:
+        while True:
+            changed = self._apply(self.render_queue.get())
+            # Fold everything that queued up meanwhile into a single redraw
+            while not self.render_queue.empty():
+                changed |= self._apply(self.render_queue.get_nowait())
+            if changed:
+                self._render()
+
+    def _render(self) -> None:
+        if self._net is None:
+            image = BG_BLANK.copy()
+        else:
+            interface, network_name, IP, rssi, cpu_temp = self._net
+            if cpu_temp is not None:
+                image = BG_CPU.copy()
+            else:
+                image = (BG_SSID if "wlan" in interface else BG_NETWORK).copy()
+            draw_network(image, interface, network_name, IP, rssi, cpu_temp)
+
+        if self._weight_str is not None:
+            draw_weight(image, self._weight_str)
+
+        self.oled.image(image)
+        self._show_changed()
+
+    def _show_changed(self) -> None:
+        """
+        Send only the page/column rectangle that differs from the last frame
+        instead of the whole 1 KiB framebuffer. Falls back to oled.show() on the
+        first frame or when more than half of the screen changed.
+        """
+        oled = self.oled
+        buffer = oled.buffer  # byte 0 is the I2C data control byte
+        previous_buffer = self._previous_buffer
+        self._previous_buffer = bytes(buffer)
+
+        if previous_buffer is None:
+            oled.show()
+            return
+
+        col_start, col_end = WIDTH, -1
+        changed_pages = []
+        for page in range(PAGES):
+            start = 1 + page * WIDTH
+            if buffer[start:start + WIDTH] == previous_buffer[start:start + WIDTH]:
+                continue
+            changed_pages.append(page)
+            first = next(c for c in range(WIDTH) if buffer[start + c] != previous_buffer[start + c])
+            last = next(c for c in range(WIDTH - 1, -1, -1) if buffer[start + c] != previous_buffer[start + c])
+            col_start, col_end = min(col_start, first), max(col_end, last)
+
+        if not changed_pages:
+            return
+
+        page_start, page_end = changed_pages[0], changed_pages[-1]
+        if (page_end - page_start + 1) * (col_end - col_start + 1) * 2 > WIDTH * PAGES:
+            oled.show()
+            return
+
+        for cmd in (SET_COL_ADDR, col_start, col_end, SET_PAGE_ADDR, page_start, page_end):
+            oled.write_cmd(cmd)
+        data = bytearray(b"\x40")
+        for page in range(page_start, page_end + 1):
+            start = 1 + page * WIDTH
+            data += buffer[start + col_start:start + col_end + 1]
+        with oled.i2c_device:
+            oled.i2c_device.write(data)
+
+    def _socket_loop(self) -> None:
+        # Bridge datagrams from other processes into the render queue
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.bind(self.socket_path)
+            os.chmod(self.socket_path, 0o666)
+            while True:
+                data = sock.recv(1024)
+                try:
+                    message = json.loads(data)
+                except ValueError:
+                    message = None
+                if isinstance(message, list) and message:
+                    self.submit(*message)
+                else:
+                    print(f"[OLED] Ignoring malformed datagram: {data!r}")
@@ -22,18 +22,45 @@ Usage:
 1. Create a YAML configuration file defining your PWM channels
 2. Initialize the PWM_hat with the configuration file and desired settings
 3. Call update_values() method with your input values to control the PWM outputs
+   (or update_values_array() when the inputs already are a numpy array)
 
 """
 
-#TODO: Better Debugging with Logging!
 #TODO: Instead of ServoKit, use the Adafruit_PCA9685 library directly (for more control)
 #TODO: channel specific PMW ranges!
 #TODO: well not that todo but currently we're controlling motors with angle values, so deprecate the "type" parameter (this goes with the PCA9685 library)
 
 
+import fastjsonschema
+import logging
+import os
+import selectors
+import struct
 import threading
+import numpy as np
 import yaml # PyYAML
 import time
+from array import array
+from functools import lru_cache
+
+try:
+    # libyaml C parser, much faster than the pure-Python one
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+try:
+    # Parsed configs are kept in a JSON sidecar next to the YAML file, see _load_channel_configs
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 try:
     from adafruit_servokit import ServoKit
@@ -42,6 +69,195 @@ except ImportError:
     SERVOKIT_AVAILABLE = False
     print("PWM module not found. Running in simulation mode.")
 
+# Per-frame messages go through logging at DEBUG level, so they cost nothing unless enabled
+log = logging.getLogger(__name__)
+
+
+def _enable_debug_output():
+    # debug=True shows the DEBUG messages even if the caller never set up logging
+    log.setLevel(logging.DEBUG)
+    if not log.hasHandlers():
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+
+# ServoKit's default servo pulse range in microseconds, used for the direct PCA9685 writes
+SERVO_MIN_PULSE = 750
+SERVO_MAX_PULSE = 2250
+PCA9685_LED0_ON_L = 0x06
+PCA9685_FULL_OFF = 0x1000  # LEDn_OFF bit 12, the power-on state of every channel
+
+# Input timestamps are time.monotonic_ns() integers
+NS_PER_SECOND = 1_000_000_000
+RATE_WINDOW_NS = 30 * NS_PER_SECOND  # get_average_input_rate looks this far back
+
+# Parsed channel configs keyed by (path, modification time), so reloading an
+# unchanged file skips the YAML parser
+_CONFIG_CACHE: dict = {}
+
+
+def _load_channel_configs(path: str) -> dict:
+    """Return CHANNEL_CONFIGS from a YAML file, parsing it only when it has changed."""
+    mtime_ns = os.stat(path).st_mtime_ns
+    key = (os.path.abspath(path), mtime_ns)
+    channel_configs = _CONFIG_CACHE.get(key)
+    if channel_configs is None:
+        channel_configs = _read_config_sidecar(path, mtime_ns)
+        if channel_configs is None:
+            with open(path, 'r') as file:
+                channel_configs = yaml.load(file, Loader=YamlLoader)['CHANNEL_CONFIGS']
+            _write_config_sidecar(path, mtime_ns, channel_configs)
+        _CONFIG_CACHE[key] = channel_configs
+    return channel_configs
+
+
+def _config_sidecar_path(path: str) -> str:
+    # config.yaml -> config.cache.json
+    return os.path.splitext(path)[0] + '.cache.json'
+
+
+def _read_config_sidecar(path: str, mtime_ns: int):
+    """Return CHANNEL_CONFIGS from the JSON sidecar, or None if it is missing or stale."""
+    if not ORJSON_AVAILABLE:
+        return None
+    try:
+        with open(_config_sidecar_path(path), 'rb') as file:
+            cached = orjson.loads(file.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    # The sidecar records the modification time of the YAML it was made from
+    if not isinstance(cached, dict) or cached.get('yaml_mtime_ns') != mtime_ns:
+        return None
+    return cached.get('CHANNEL_CONFIGS')
+
+
+def _write_config_sidecar(path: str, mtime_ns: int, channel_configs: dict) -> None:
+    if not ORJSON_AVAILABLE:
+        return
+    try:
+        data = orjson.dumps({'yaml_mtime_ns': mtime_ns, 'CHANNEL_CONFIGS': channel_configs})
+        with open(_config_sidecar_path(path), 'wb') as file:
+            file.write(data)
+    except (OSError, TypeError):
+        pass  # read-only config directory or values JSON can't hold, just parse the YAML next time
+
+
+# Gamma curves are tabulated per channel over |input| in [0, 1]. Inputs are
+# rounded to the nearest of GAMMA_LUT_SIZE bins, which moves the angle by a few
+# hundredths of a degree at most (about 0.035 with multiplier 30, gamma 2.3),
+# far below one step of the PCA9685 output (about 0.6 degrees).
+GAMMA_LUT_SIZE = 1024
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True)
+    def _compute_angles(values, centers, lut_pos, lut_neg, mult_pos, mult_neg, directions, out):
+        """Gamma correct, scale and clamp the inputs of all angle channels into out."""
+        for i in range(values.shape[0]):
+            value = values[i]
+            index = min(int(abs(value) * (GAMMA_LUT_SIZE - 1) + 0.5), GAMMA_LUT_SIZE - 1)
+            if value >= 0:
+                corrected = lut_pos[i, index] * mult_pos[i]
+            else:
+                corrected = -lut_neg[i, index] * mult_neg[i]
+            angle = centers[i] + corrected * directions[i]
+            out[i] = 0.0 if angle < 0 else 180.0 if angle > 180 else angle
+else:
+    def _compute_angles(values, centers, lut_pos, lut_neg, mult_pos, mult_neg, directions, out):
+        """Gamma correct, scale and clamp the inputs of all angle channels into out."""
+        rows = np.arange(values.shape[0])
+        index = np.minimum((np.abs(values) * (GAMMA_LUT_SIZE - 1) + 0.5).astype(np.intp), GAMMA_LUT_SIZE - 1)
+        positive = values >= 0
+        magnitude = np.where(positive, lut_pos[rows, index], lut_neg[rows, index])
+        corrected = np.where(positive, magnitude * mult_pos, -magnitude * mult_neg)
+        np.clip(centers + corrected * directions, 0, 180, out=out)
+
+
+def _channel_schema(num_inputs: int, num_outputs: int) -> dict:
+    """JSON schema for one entry of CHANNEL_CONFIGS."""
+    return {
+        'type': 'object',
+        'required': ['type', 'input_channel', 'output_channel', 'direction', 'offset'],
+        'properties': {
+            'type': {'enum': ['angle', 'pump']},
+            # 'None' (a string in the YAML) means the channel has no direct input
+            'input_channel': {'anyOf': [{'const': 'None'},
+                                        {'type': 'integer', 'minimum': 0, 'maximum': num_inputs - 1}]},
+            'output_channel': {'type': 'integer', 'minimum': 0, 'maximum': num_outputs - 1},
+            'direction': {'enum': [-1, 1]},
+            'offset': {'type': 'number', 'minimum': -30, 'maximum': 30},
+        },
+        'allOf': [
+            {
+                'if': {'properties': {'type': {'const': 'angle'}}},
+                'then': {
+                    'required': ['multiplier_positive', 'multiplier_negative', 'gamma_positive', 'gamma_negative',
+                                 'affects_pump'],
+                    'properties': {
+                        'multiplier_positive': {'$ref': '#/definitions/multiplier'},
+                        'multiplier_negative': {'$ref': '#/definitions/multiplier'},
+                        'gamma_positive': {'$ref': '#/definitions/gamma'},
+                        'gamma_negative': {'$ref': '#/definitions/gamma'},
+                        'affects_pump': {'type': 'boolean'},
+                    },
+                },
+            },
+            {
+                'if': {'properties': {'type': {'const': 'pump'}}},
+                'then': {
+                    'required': ['idle', 'multiplier'],
+                    'properties': {
+                        'idle': {'type': 'number', 'minimum': -1, 'maximum': 1},
+                        'multiplier': {'type': 'number', 'exclusiveMinimum': 0, 'maximum': 10},
+                    },
+                },
+            },
+        ],
+        'definitions': {
+            # 1 to 50 in either direction
+            'multiplier': {'type': 'number', 'anyOf': [{'minimum': 1, 'maximum': 50},
+                                                      {'minimum': -50, 'maximum': -1}]},
+            'gamma': {'type': 'number', 'minimum': 0.1, 'maximum': 3.0},
+        },
+    }
+
+
+@lru_cache(maxsize=None)
+def _channel_validator(num_inputs: int, num_outputs: int):
+    """Compile the channel schema into a validator function, once per channel count."""
+    return fastjsonschema.compile(_channel_schema(num_inputs, num_outputs))
+
+
+class _InputRing:
+    """
+    Single-producer single-consumer ring of input timestamps.
+
+    update_values() pushes, the monitor thread drains. Each side only writes
+    its own index, so no lock or Event is needed between them.
+    """
+    __slots__ = ('_buf', '_mask', '_w', '_r')
+
+    def __init__(self, size: int = 1024) -> None:
+        # size must be a power of two
+        self._buf = array('q', bytes(8 * size))  # time.monotonic_ns() values
+        self._mask = size - 1
+        self._w = 0
+        self._r = 0
+
+    def push(self, timestamp: int) -> None:
+        w = self._w
+        self._buf[w & self._mask] = timestamp
+        self._w = w + 1  # publish after the slot is written
+
+    def drain(self) -> list:
+        """Return the timestamps pushed since the last drain, oldest first."""
+        w = self._w
+        # If the producer lapped us, only the newest len(buf) entries are still there
+        r = max(self._r, w - len(self._buf))
+        buf, mask = self._buf, self._mask
+        timestamps = [buf[i & mask] for i in range(r, w)]
+        self._r = w
+        return timestamps
+
 
 class PWM_hat:
     def __init__(self, config_file: str, simulation_mode: bool = False, pump_variable: bool = True,
@@ -50,14 +266,12 @@ class PWM_hat:
 
         self.simulation_mode = simulation_mode
 
-        with open(config_file, 'r') as file:
-            configs = yaml.safe_load(file)
-            self.channel_configs = configs['CHANNEL_CONFIGS']
+        self.channel_configs = _load_channel_configs(config_file)
 
         self.pump_variable = pump_variable
         self.tracks_disabled = tracks_disabled
 
-        self.values = [0.0 for _ in range(pwm_channels)]
+        self.values = np.zeros(pwm_channels)  # capped input per output channel
         self.num_inputs = self.calculate_num_inputs()
         self.num_outputs = pwm_channels
 
@@ -67,20 +281,26 @@ class PWM_hat:
         self.skip_rate_checking = (input_rate_threshold == 0)
         self.is_safe_state = not self.skip_rate_checking
 
-        self.input_event = threading.Event()
+        self._input_ring = _InputRing()
+        # The monitor thread sleeps in select() on this pipe, stop_monitoring() writes to wake it
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
         self.monitor_thread = None
         self.running = False
 
         self.is_safe_state = True
         self.input_count = 0
-        self.last_input_time = time.time()
-        self.input_timestamps = []
+        self.last_input_time = time.monotonic_ns()
+        # Ring of monotonic_ns timestamps for get_average_input_rate, written by the monitor thread
+        self.input_timestamps = np.zeros(max(1024, int(input_rate_threshold * 30 * 2)), dtype=np.int64)
+        self.input_timestamp_count = 0
 
         self.center_val_servo = 90
         self.deadzone = deadzone
 
         self.return_servo_angles = False
-        self.servo_angles = {}
 
         self.pump_enabled = True    # Enable pump by default
         self.pump_variable_sum = 0.0
@@ -93,15 +313,12 @@ class PWM_hat:
                 print("ServoKit is not available. Falling back to simulation mode.")
             print("Using ServoKitStub for simulation.")
             self.kit = ServoKitStub(channels=pwm_channels)
+        self._setup_pwm_output()
 
         self.validate_configuration()
+        self._compile_channel_tables()
         self.defined_channel_types = self.get_defined_channel_types()
 
-        # set servo angles to None at start
-        self.servo_angles = {f"{channel_name} angle": None
-                             for channel_name, config in self.channel_configs.items()
-                             if config['type'] == 'angle'}
-
         self.reset()
 
         if not self.skip_rate_checking:    # Start monitoring if threshold is set
@@ -118,69 +335,141 @@ class PWM_hat:
 
     def validate_configuration(self) -> None:
         """Validate the configuration file."""
-        required_keys = ['type', 'input_channel', 'output_channel', 'direction', 'offset']
-        angle_specific_keys = ['multiplier_positive', 'multiplier_negative', 'gamma_positive', 'gamma_negative']
-        pump_specific_keys = ['idle', 'multiplier']
-
+        validate = _channel_validator(self.num_inputs, self.num_outputs)
         for channel_name, config in self.channel_configs.items():
-            # Validate existence of required keys
-            for key in required_keys:
-                if key not in config:
-                    raise ValueError(f"Missing '{key}' in configuration for channel '{channel_name}'")
-
-            # Validate types of operation
-            if config['type'] not in ['angle', 'pump']:
-                raise ValueError(f"Invalid type '{config['type']}' for channel '{channel_name}'")
-
-            # Validate input_channel
-            if config['input_channel'] != 'None':
-                if not isinstance(config['input_channel'], int) or not (0 <= config['input_channel'] < self.num_inputs):
-                    raise ValueError(f"Invalid input_channel {config['input_channel']} for channel '{channel_name}'")
-
-            # Validate output_channel
-            if not isinstance(config['output_channel'], int) or not (0 <= config['output_channel'] < self.num_outputs):
-                raise ValueError(f"Invalid output_channel {config['output_channel']} for channel '{channel_name}'")
-
-            # Validate direction
-            if config['direction'] not in [-1, 1]:
-                raise ValueError(f"Invalid direction {config['direction']} for channel '{channel_name}'")
-
-            # Validate offset
-            if not (-30 <= config['offset'] <= 30):
-                raise ValueError(f"Offset {config['offset']} out of range (-30 to 30) for channel '{channel_name}'")
-
-            # Validate angle-specific configuration
-            if config['type'] == 'angle':
-                for key in angle_specific_keys:
-                    if key not in config:
-                        raise ValueError(f"Missing '{key}' in configuration for angle type channel '{channel_name}'")
-                    if 'gamma' in key:
-                        if not (0.1 <= config[key] <= 3.0):
-                            raise ValueError(
-                                f"{key} {config[key]} out of range (0.1 to 3.0) for channel '{channel_name}'")
-                    elif 'multiplier' in key:
-                        if not (1 <= abs(config[key]) <= 50):
-                            raise ValueError(f"{key} {config[key]} out of range (1 to 50) for channel '{channel_name}'")
-
-                # Validate affects_pump
-                if 'affects_pump' not in config or not isinstance(config['affects_pump'], bool):
-                    raise ValueError(f"Missing or invalid 'affects_pump' for angle type channel '{channel_name}'")
-
-            # Validate pump-specific configuration
-            elif config['type'] == 'pump':
-                for key in pump_specific_keys:
-                    if key not in config:
-                        raise ValueError(f"Missing '{key}' in configuration for pump type channel '{channel_name}'")
-
-                if not (-1 <= config['idle'] <= 1):
-                    raise ValueError(f"Idle {config['idle']} out of range (-1 to 1) for pump channel '{channel_name}'")
-
-                if not (0 < config['multiplier'] <= 10):
-                    raise ValueError(
-                        f"Multiplier {config['multiplier']} out of range (0 to 10) for pump channel '{channel_name}'")
+            try:
+                validate(config)
+            except fastjsonschema.JsonSchemaValueException as e:
+                raise ValueError(f"Invalid configuration for channel '{channel_name}': {e.message}") from e
 
         print("Configuration validation completed successfully.")
 
+    def _compile_channel_tables(self) -> None:
+        """
+        Flatten the validated channel configs into tuples for the update path,
+        so handle_angles and handle_pump don't do dict lookups on every frame.
+        """
+        angle_configs = tuple((channel_name, config) for channel_name, config in self.channel_configs.items()
+                              if config['type'] == 'angle')
+
+        # Which handlers update_values has to run
+        channel_types = self.get_defined_channel_types()
+        self._has_pump = 'pump' in channel_types
+        self._has_angle = 'angle' in channel_types
+
+        # One entry per angle channel: (output_channel, is a track)
+        self._angle_table = [(config['output_channel'], channel_name in ('trackL', 'trackR'))
+                             for channel_name, config in angle_configs]
+        # Last angle sent per channel, NaN if it was not updated. Read through servo_angles
+        self._angle_names = tuple(f"{channel_name} angle" for channel_name, _ in angle_configs)
+        self._angle_buf = np.full(len(angle_configs), np.nan)
+
+        # Per-channel parameters as arrays for _compute_angles
+        def column(key, default=None):
+            return np.array([config.get(key, default) for _, config in angle_configs], dtype=np.float64)
+
+        self._angle_out_idx = np.array([config['output_channel'] for _, config in angle_configs], dtype=np.intp)
+        self._angle_centers = self.center_val_servo + column('offset')
+        lut_inputs = np.linspace(0.0, 1.0, GAMMA_LUT_SIZE)
+        self._angle_lut_pos = lut_inputs ** column('gamma_positive', 1)[:, np.newaxis]
+        self._angle_lut_neg = lut_inputs ** column('gamma_negative', 1)[:, np.newaxis]
+        self._angle_mult_pos = column('multiplier_positive', 1)
+        self._angle_mult_neg = column('multiplier_negative', 1)
+        self._angle_directions = column('direction')
+        self._angles = np.zeros(len(angle_configs))
+        # (output_channel, center angle) pairs for reset()
+        self._reset_angles = tuple(zip(self._angle_out_idx.tolist(), self._angle_centers.tolist()))
+
+        # Index arrays for the vectorised input -> output step in update_values
+        direct_channels = [config for config in self.channel_configs.values()
+                           if isinstance(config['input_channel'], int)]
+        self._in_idx = np.array([config['input_channel'] for config in direct_channels], dtype=np.intp)
+        self._out_idx = np.array([config['output_channel'] for config in direct_channels], dtype=np.intp)
+        self._affects_pump_idx = np.array([config['input_channel'] for config in direct_channels
+                                           if config.get('affects_pump', False)], dtype=np.intp)
+        self._affects_pump_buf = np.zeros(len(self._affects_pump_idx))
+        self._raw = np.zeros(self.num_inputs)
+
+        # (output_channel, multiplier, idle, input_channel), input_channel is None without direct control
+        pump_config = self.channel_configs.get('pump')
+        if pump_config is None:
+            self._pump_params = None
+        else:
+            input_channel = pump_config.get('input_channel')
+            self._pump_params = (pump_config['output_channel'], pump_config['multiplier'], pump_config['idle'],
+                                 None if input_channel == 'None' else input_channel)
+        self._select_pump_fn()
+
+        self._warm_up()
+
+    def _warm_up(self) -> None:
+        """
+        Run the numeric part of an update once on zero inputs, so the Numba
+        kernel is compiled (or loaded from its disk cache) and the NumPy calls
+        are set up here instead of in the first real frame. Outputs and
+        controller state are not touched, the buffers used are scratch space.
+        """
+        raw = self._raw
+        raw.fill(0.0)
+        np.clip(raw, -1, 1, out=raw)
+        np.take(raw, self._affects_pump_idx, out=self._affects_pump_buf)
+        np.abs(self._affects_pump_buf, out=self._affects_pump_buf)
+        self._affects_pump_buf.sum()
+        self._compute_angle_outputs(np.zeros(self.num_outputs))
+
+    def _setup_pwm_output(self) -> None:
+        """
+        Prepare direct PCA9685 writes. Channel updates are collected in a shadow
+        of the LEDn_OFF registers and sent by _flush() in a single I2C burst,
+        instead of one transaction per channel through ServoKit. The stub used in
+        simulation has no PCA9685 and keeps getting per-channel writes.
+        """
+        self._pca = getattr(self.kit, '_pca', None)
+        self._pwm_ticks = [PCA9685_FULL_OFF] * self.num_outputs
+        self._dirty_low, self._dirty_high = self.num_outputs, -1
+
+        if self._pca is not None:
+            # Same duty cycle math as adafruit_motor's servo classes
+            frequency = self._pca.frequency
+            self._min_duty = int((SERVO_MIN_PULSE * frequency) / 1000000 * 0xFFFF)
+            self._duty_range = int((SERVO_MAX_PULSE * frequency) / 1000000 * 0xFFFF - self._min_duty)
+
+    def _set_fraction(self, channel: int, fraction: float) -> None:
+        duty_cycle = self._min_duty + int(fraction * self._duty_range)
+        self._pwm_ticks[channel] = duty_cycle >> 4  # 16-bit duty cycle to the PCA9685's 12 bits
+        if channel < self._dirty_low:
+            self._dirty_low = channel
+        if channel > self._dirty_high:
+            self._dirty_high = channel
+
+    def _set_angle(self, channel: int, angle: float) -> None:
+        if self._pca is None:
+            self.kit.servo[channel].angle = angle
+        else:
+            self._set_fraction(channel, angle / 180)
+
+    def _set_throttle(self, channel: int, throttle: float) -> None:
+        if self._pca is None:
+            self.kit.continuous_servo[channel].throttle = throttle
+        else:
+            self._set_fraction(channel, (throttle + 1) / 2)
+
+    def _flush(self) -> None:
+        """Send every channel changed since the last flush to the PCA9685 in one write."""
+        low, high = self._dirty_low, self._dirty_high
+        if high < low:
+            return
+        self._dirty_low, self._dirty_high = self.num_outputs, -1
+
+        # ServoKit's frequency setup turned on register auto-increment, so the
+        # LEDn_ON/LEDn_OFF pairs of consecutive channels can be written in one go
+        data = bytearray((PCA9685_LED0_ON_L + 4 * low,))
+        for ticks in self._pwm_ticks[low:high + 1]:
+            data += struct.pack('<HH', 0, ticks)
+        i2c_device = self._pca.i2c_device
+        with i2c_device:
+            i2c_device.write(data)
+
     def start_monitoring(self) -> None:
         """Start the input rate monitoring thread."""
         if self.skip_rate_checking:
@@ -198,7 +487,7 @@ class PWM_hat:
         """Stop the input rate monitoring thread."""
         self.running = False
         if self.monitor_thread is not None:
-            self.input_event.set()  # Wake up the thread if it's waiting
+            os.write(self._wake_w, b'\0')  # Wake up the thread if it's waiting
             self.monitor_thread.join()
             self.monitor_thread = None
             print("Stopped input rate monitoring...")
@@ -206,15 +495,19 @@ class PWM_hat:
     def monitor_input_rate(self) -> None:
         print("Monitoring input rate...")
         while self.running:
-            if self.input_event.wait(timeout=1.0 / self.input_rate_threshold):
-                self.input_event.clear()
-                current_time = time.time()
+            # Check once per expected input period what arrived in the meantime
+            if self._selector.select(timeout=1.0 / self.input_rate_threshold):
+                os.read(self._wake_r, 4096)  # woken by stop_monitoring()
+                continue
+            timestamps = self._input_ring.drain()
+
+            for current_time in timestamps:
                 time_diff = current_time - self.last_input_time
                 self.last_input_time = current_time
 
                 if time_diff > 0:
-                    current_rate = 1 / time_diff
-                    if current_rate >= self.input_rate_threshold:
+                    # Same as 1 / time_diff >= threshold, in integer nanoseconds
+                    if time_diff * self.input_rate_threshold <= NS_PER_SECOND:
                         self.input_count += 1
                         # Require consecutive good inputs. 25% of threshold rate, rounded down
                         if self.input_count >= int(self.input_rate_threshold * 0.25):
@@ -224,12 +517,11 @@ class PWM_hat:
                         self.input_count = 0
 
                     # Save the timestamp for monitoring
-                    self.input_timestamps.append(current_time)
-
-                    # Remove timestamps older than 30 seconds
-                    self.input_timestamps = [t for t in self.input_timestamps if current_time - t <= 30]
+                    count = self.input_timestamp_count
+                    self.input_timestamps[count % len(self.input_timestamps)] = current_time
+                    self.input_timestamp_count = count + 1
 
-            else:
+            if not timestamps:
                 if self.is_safe_state:
                     print("Input rate too low. Entering safe state...")
                     self.reset(reset_pump=False)
@@ -237,23 +529,13 @@ class PWM_hat:
                     self.input_count = 0
 
     def update_values(self, raw_values, min_cap=-1, max_cap=1, debug=False):
-        # Reset all angles to None at the start of each update
-        for key in self.servo_angles:
-            self.servo_angles[key] = None
-
-        # Signal the monitoring thread that we have new input
-        if not self.skip_rate_checking:
-            self.input_event.set()
-
         if debug:
-            print(f"Debug: update_values called with raw_values: {raw_values}")
-            print(f"Debug: Current safe state: {self.is_safe_state}")
-            print(f"Debug: skip_rate_checking: {self.skip_rate_checking}")
+            _enable_debug_output()
+            log.debug("update_values called with raw_values: %s", raw_values)
+            log.debug("Current safe state: %s", self.is_safe_state)
+            log.debug("skip_rate_checking: %s", self.skip_rate_checking)
 
-
-
-        if not self.skip_rate_checking and not self.is_safe_state:
-            print(f"System in safe state. Ignoring input. Average rate: {self.get_average_input_rate():.2f}Hz")
+        if not self._accept_input():
             return
 
         if raw_values is None:
@@ -268,109 +550,146 @@ class PWM_hat:
             self.reset()
             raise ValueError(f"Expected {self.num_inputs} inputs, but received {len(raw_values)}.")
 
-        deadzone_threshold = self.deadzone / 100.0 * (max_cap - min_cap)
+        self._update_from_ndarray(raw_values, min_cap, max_cap)
 
-        self.pump_variable_sum = 0.0
-        for channel_name, config in self.channel_configs.items():
-            input_channel = config['input_channel']
-            if input_channel is None or not isinstance(input_channel, int) or input_channel >= len(raw_values):
-                continue
+    def update_values_array(self, raw_values, min_cap=-1, max_cap=1):
+        """
+        Preferred entry point for control loops. raw_values must be a float
+        numpy array of num_inputs values, it is read directly without the
+        type and length checks of update_values and is not modified.
+        """
+        if not self._accept_input():
+            return
+        self._update_from_ndarray(raw_values, min_cap, max_cap)
 
-            # Check if the value is within the limits
-            capped_value = max(min_cap, min(raw_values[input_channel], max_cap))
+    def _accept_input(self):
+        # Per-frame bookkeeping shared by the update entry points, False while in safe state
+        # Reset all angles to None at the start of each update
+        self._angle_buf.fill(np.nan)
 
-            # Check deadzone
-            if abs(capped_value) < deadzone_threshold:
-                capped_value = 0.0
+        # Hand the input time to the monitoring thread
+        if not self.skip_rate_checking:
+            self._input_ring.push(time.monotonic_ns())
 
-            self.values[config['output_channel']] = capped_value
+        if not self.skip_rate_checking and not self.is_safe_state:
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("System in safe state. Ignoring input. Average rate: %.2fHz", self.get_average_input_rate())
+            return False
+        return True
+
+    def _update_from_ndarray(self, raw_values, min_cap, max_cap):
+        deadzone_threshold = self.deadzone / 100.0 * (max_cap - min_cap)
 
-            if config.get('affects_pump', False):
-                self.pump_variable_sum += abs(capped_value)
+        # Cap to the limits and apply the deadzone for all inputs at once
+        raw = self._raw
+        np.clip(raw_values, min_cap, max_cap, out=raw)
+        raw[np.abs(raw) < deadzone_threshold] = 0.0
+
+        self.values[self._out_idx] = raw[self._in_idx]
+        # Sum of the pump-affecting inputs, gathered into a preallocated buffer
+        pump_inputs = self._affects_pump_buf
+        np.take(raw, self._affects_pump_idx, out=pump_inputs)
+        np.abs(pump_inputs, out=pump_inputs)
+        self.pump_variable_sum = float(pump_inputs.sum())
+
+        # The per-channel handlers work on plain floats
+        values = self.values.tolist()
 
         # Handle pump if configured
-        if 'pump' in self.defined_channel_types:
-            self.handle_pump(self.values)
+        if self._has_pump:
+            self.handle_pump(values)
 
         # Handle angles if configured
-        if 'angle' in self.defined_channel_types:
+        if self._has_angle:
             self.handle_angles(self.values)
 
+        self._flush()
+
     def handle_pump(self, values, debug=False):
-        pump_config = self.channel_configs['pump']
-        pump_channel = pump_config['output_channel']
-        pump_multiplier = pump_config['multiplier']
-        pump_idle = pump_config['idle']
-        input_channel = pump_config.get('input_channel')
+        pump_channel, pump_multiplier, pump_idle, input_channel = self._pump_params
 
         if debug:
-            print(f"Debug: input_channel = {input_channel}, type = {type(input_channel)}")
-            print(f"Debug: pump_variable = {self.pump_variable}")
-            print(f"Debug: pump_variable_sum = {self.pump_variable_sum}")
-            print(f"Debug: manual_pump_load = {self.manual_pump_load}")
-
-        if not self.pump_enabled:
-            throttle_value = -1.0  # Set to -1 when pump is disabled
-            print("Debug: Pump is disabled")
-        elif input_channel is None or input_channel == 'None':
-            # No direct input channel, use variable pump sum if enabled
-            #print("Debug: No direct input channel")
-            if self.pump_variable:
-                throttle_value = pump_idle + (pump_multiplier * self.pump_variable_sum)
-                #print(f"Debug: Using variable pump sum. Calculated throttle: {throttle_value}")
-            else:
-                throttle_value = pump_idle + (pump_multiplier / 10)
-                #print(f"Debug: Not using variable pump sum. Calculated throttle: {throttle_value}")
-
-            # Add manual pump load
-            throttle_value += self.manual_pump_load
-            #print(f"Debug: After adding manual pump load. Throttle: {throttle_value}")
-        elif isinstance(input_channel, int) and 0 <= input_channel < len(values):
-            throttle_value = values[input_channel]
-            # print(f"Debug: Using direct input channel {input_channel}. Throttle: {throttle_value}")
-        else:
-            print(f"Warning: Invalid input channel {input_channel}. Using pump_idle.")
-            throttle_value = pump_idle
+            _enable_debug_output()
+            log.debug("input_channel = %s, type = %s", input_channel, type(input_channel))
+            log.debug("pump_variable = %s", self.pump_variable)
+            log.debug("pump_variable_sum = %s", self.pump_variable_sum)
+            log.debug("manual_pump_load = %s", self.manual_pump_load)
 
-        throttle_value = max(-1.0, min(1.0, throttle_value))
-        #print(f"Debug: Final throttle value after clamping: {throttle_value}")
+        # The branch for the current pump settings was picked by _select_pump_fn
+        throttle_value = self._pump_fn(values)
 
-        self.kit.continuous_servo[pump_channel].throttle = throttle_value
+        self._set_throttle(pump_channel, throttle_value)
 
         return throttle_value  # Return the final throttle value for debugging
 
-    def handle_angles(self, values):
-        for channel_name, config in self.channel_configs.items():
-            if config['type'] == 'angle':
-                if self.tracks_disabled and channel_name in ['trackL', 'trackR']:
-                    continue
+    def _select_pump_fn(self) -> None:
+        """
+        Pick the throttle function for the current pump config and settings, so
+        handle_pump doesn't re-test them on every frame. Called again by the
+        setters that change pump_enabled or pump_variable.
+        """
+        if self._pump_params is None:
+            self._pump_fn = None
+            return
+        _, multiplier, idle, input_channel = self._pump_params
+        self._pump_idle = idle
+        self._pump_multiplier = multiplier
+        self._pump_static_throttle = idle + (multiplier / 10)
+        self._pump_input = input_channel
 
-                output_channel = config['output_channel']
+        if not self.pump_enabled:
+            self._pump_fn = self._pump_disabled
+        elif input_channel is not None:
+            # Direct control from an input channel
+            self._pump_fn = self._pump_direct
+        elif self.pump_variable:
+            # No direct input channel, speed follows the affects_pump channels
+            self._pump_fn = self._pump_variable
+        else:
+            self._pump_fn = self._pump_static
 
-                if output_channel >= len(values):
-                    print(f"Channel '{channel_name}': No data available.")
-                    continue
+    def _pump_disabled(self, values):
+        log.debug("Pump is disabled")
+        return -1.0  # Set to -1 when pump is disabled
 
-                input_value = values[output_channel]
-                center = self.center_val_servo + config['offset']
+    def _pump_variable(self, values):
+        throttle_value = self._pump_idle + (self._pump_multiplier * self.pump_variable_sum) + self.manual_pump_load
+        # Clamps are written as comparisons, cheaper than max()/min() calls every frame
+        return throttle_value if -1.0 <= throttle_value <= 1.0 else (-1.0 if throttle_value < -1.0 else 1.0)
 
-                if input_value >= 0:
-                    gamma = config.get('gamma_positive', 1)
-                    multiplier = config.get('multiplier_positive', 1)
-                    normalized_input = input_value
-                else:
-                    gamma = config.get('gamma_negative', 1)
-                    multiplier = config.get('multiplier_negative', 1)
-                    normalized_input = -input_value
+    def _pump_static(self, values):
+        throttle_value = self._pump_static_throttle + self.manual_pump_load
+        return throttle_value if -1.0 <= throttle_value <= 1.0 else (-1.0 if throttle_value < -1.0 else 1.0)
 
-                adjusted_input = normalized_input ** gamma
-                gamma_corrected_value = adjusted_input if input_value >= 0 else -adjusted_input
+    def _pump_direct(self, values):
+        throttle_value = values[self._pump_input]
+        return throttle_value if -1.0 <= throttle_value <= 1.0 else (-1.0 if throttle_value < -1.0 else 1.0)
 
-                angle = center + (gamma_corrected_value * multiplier * config['direction'])
-                angle = max(0, min(180, angle))
+    def _compute_angle_outputs(self, values):
+        """Return the clamped servo angle of every angle channel for the given output values."""
+        inputs = np.asarray(values, dtype=np.float64)[self._angle_out_idx]
+        _compute_angles(inputs, self._angle_centers, self._angle_lut_pos, self._angle_lut_neg,
+                        self._angle_mult_pos, self._angle_mult_neg, self._angle_directions, self._angles)
+        return self._angles.tolist()
 
-                self.kit.servo[config['output_channel']].angle = angle
-                self.servo_angles[f"{channel_name} angle"] = round(angle, 1)
+    def handle_angles(self, values):
+        tracks_disabled = self.tracks_disabled
+        set_angle = self._set_angle
+        angle_buf = self._angle_buf
+
+        for i, ((output_channel, is_track), angle) in enumerate(zip(self._angle_table,
+                                                                   self._compute_angle_outputs(values))):
+            if tracks_disabled and is_track:
+                continue
+
+            set_angle(output_channel, angle)
+            angle_buf[i] = round(angle, 1)
+
+    @property
+    def servo_angles(self) -> dict:
+        """Angles set by the last update as {'<channel> angle': degrees}, None for channels it skipped."""
+        return {name: (None if np.isnan(angle) else angle)
+                for name, angle in zip(self._angle_names, self._angle_buf.tolist())}
 
     def reset(self, reset_pump=True, pump_reset_point=-1.0):
         """
@@ -380,12 +699,13 @@ class PWM_hat:
         :param pump_reset_point: The throttle value to set the pump to when resetting. ESC dependant.
         """
 
-        for config in self.channel_configs.values():
-            if config['type'] == 'angle':
-                self.kit.servo[config['output_channel']].angle = self.center_val_servo + config.get('offset', 0)
+        for output_channel, center in self._reset_angles:
+            self._set_angle(output_channel, center)
 
-        if reset_pump and 'pump' in self.channel_configs:
-            self.kit.continuous_servo[self.channel_configs['pump']['output_channel']].throttle = pump_reset_point
+        if reset_pump and self._pump_params is not None:
+            self._set_throttle(self._pump_params[0], pump_reset_point)
+
+        self._flush()
 
         self.is_safe_state = False
         self.input_count = 0
@@ -420,6 +740,7 @@ class PWM_hat:
             print("Pump value must be boolean.")
             return
         self.pump_enabled = bool_value
+        self._select_pump_fn()
         print(f"Pump enabled set to: {self.pump_enabled}!")
         # Update pump state immediately
         # self.handle_pump(self.values)
@@ -430,6 +751,7 @@ class PWM_hat:
             print("Pump variable value must be boolean.")
             return
         self.pump_variable = bool_value
+        self._select_pump_fn()
         print(f"Pump variable set to: {self.pump_variable}!")
 
     def reload_config(self, config_file):
@@ -437,17 +759,19 @@ class PWM_hat:
         # Reset the controller
         self.reset()
 
-        # Re-read the config file
-        with open(config_file, 'r') as file:
-            configs = yaml.safe_load(file)
-            self.channel_configs = configs['CHANNEL_CONFIGS']
+        # Re-read the config file (cached if it has not changed)
+        self.channel_configs = _load_channel_configs(config_file)
 
         # Validate the new configuration
         self.validate_configuration()
+        self._compile_channel_tables()
 
         # Reinitialize necessary components
         if SERVOKIT_AVAILABLE and not self.simulation_mode:
             self.kit = ServoKit(channels=self.num_outputs)
+            self._setup_pwm_output()
+            # Put the new board in the reset state, this is also its first I2C write
+            self.reset()
 
         # Restart monitoring if it was running
         if self.running:
@@ -488,18 +812,23 @@ class PWM_hat:
 
         :return: Average input rate in Hz, or 0 if no inputs in the last 30 seconds.
         """
-        current_time = time.time()
+        current_time = time.monotonic_ns()
+
+        # Stored timestamps in order, oldest first (the monitor thread keeps appending)
+        count = self.input_timestamp_count
+        size = len(self.input_timestamps)
+        timestamps = self.input_timestamps[np.arange(max(0, count - size), count) % size]
 
-        # Filter timestamps to last 30 seconds
-        recent_timestamps = [t for t in self.input_timestamps if current_time - t <= 30]
+        # Keep the last 30 seconds
+        recent_timestamps = timestamps[current_time - timestamps <= RATE_WINDOW_NS]
 
         if len(recent_timestamps) < 2:
             return 0.0  # Not enough data to calculate rate
 
         # Calculate rate based on number of inputs and time span
-        time_span = recent_timestamps[-1] - recent_timestamps[0]
+        time_span = int(recent_timestamps[-1] - recent_timestamps[0])
         if time_span > 0:
-            return (len(recent_timestamps) - 1) / time_span
+            return (len(recent_timestamps) - 1) * NS_PER_SECOND / time_span
         else:
             return 0.0  # Avoid division by zero
 
@@ -513,12 +842,14 @@ class PWM_hat:
         self.manual_pump_load = max(-1.0, min(1.0, self.manual_pump_load + adjustment))
 
         # Re-calculate pump throttle with new manual load
-        current_throttle = self.handle_pump(self.values)
+        current_throttle = self.handle_pump(self.values.tolist())
+        self._flush()
 
         if debug:
-            print(f"Current pump throttle: {current_throttle:.2f}")
-            print(f"Current manual pump load: {self.manual_pump_load:.2f}")
-            print(f"Current pump variable sum: {self.pump_variable_sum:.2f}")
+            _enable_debug_output()
+            log.debug("Current pump throttle: %.2f", current_throttle)
+            log.debug("Current manual pump load: %.2f", self.manual_pump_load)
+            log.debug("Current pump variable sum: %.2f", self.pump_variable_sum)
 
     def reset_pump_load(self, debug=False):
         """
@@ -529,39 +860,72 @@ class PWM_hat:
         self.manual_pump_load = 0.0
 
         # Re-calculate pump throttle without manual load
-        current_throttle = self.handle_pump(self.values)
+        current_throttle = self.handle_pump(self.values.tolist())
+        self._flush()
 
         if debug:
-            print(f"Pump load reset. Current pump throttle: {current_throttle:.2f}")
+            _enable_debug_output()
+            log.debug("Pump load reset. Current pump throttle: %.2f", current_throttle)
 
 class ServoKitStub:
+    """
+    Simulated ServoKit. Angles and throttles of all channels live in two flat
+    arrays, kit.servo[i] and kit.continuous_servo[i] are light views into them.
+    """
     def __init__(self, channels):
         self.channels = channels
-        self.servo = [ServoStub() for _ in range(channels)]
-        self.continuous_servo = [ContinuousServoStub() for _ in range(channels)]
+        self.angles = np.full(channels, 90.0, dtype=np.float32)
+        self.throttles = np.zeros(channels, dtype=np.float32)
+        self.servo = _StubView(self.angles, ServoStub)
+        self.continuous_servo = _StubView(self.throttles, ContinuousServoStub)
+
+class _StubView:
+    # Sequence of per-channel stubs over one of the ServoKitStub arrays
+    __slots__ = ('_values', '_stub_type')
+
+    def __init__(self, values, stub_type):
+        self._values = values
+        self._stub_type = stub_type
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, channel):
+        return self._stub_type(self._values, channel)
+
+    def __iter__(self):
+        return (self._stub_type(self._values, channel) for channel in range(len(self._values)))
 
 class ServoStub:
-    def __init__(self):
-        self._angle = 90
+    __slots__ = ('_angles', '_channel')
+
+    def __init__(self, angles, channel):
+        self._angles = angles
+        self._channel = channel
 
     @property
     def angle(self):
-        return self._angle
+        return float(self._angles[self._channel])
 
     @angle.setter
     def angle(self, value):
-        self._angle = max(0, min(180, value))
-        print(f"[SIMULATION] Servo angle set to: {self._angle} degrees")
+        self._angles[self._channel] = value if 0 <= value <= 180 else (0 if value < 0 else 180)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("[SIMULATION] Servo angle set to: %s degrees", self._angles[self._channel])
 
 class ContinuousServoStub:
-    def __init__(self):
-        self._throttle = 0
+    __slots__ = ('_throttles', '_channel')
+
+    def __init__(self, throttles, channel):
+        self._throttles = throttles
+        self._channel = channel
 
     @property
     def throttle(self):
-        return self._throttle
+        return float(self._throttles[self._channel])
 
     @throttle.setter
     def throttle(self, value):
-        self._throttle = max(-1, min(1, value))
-        print(f"[SIMULATION] Continuous servo throttle set to: {self._throttle}")
+        self._throttles[self._channel] = value if -1 <= value <= 1 else (-1 if value < -1 else 1)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("[SIMULATION] Continuous servo throttle set to: %s", self._throttles[self._channel])
@@ -1,9 +1,71 @@
 import math
+import os
+import selectors
+import struct
 import threading
 import time
 import evdev
+import numpy as np
+from collections import namedtuple
+from functools import partial
 from evdev import InputDevice, categorize, ecodes
 
+try:
+    # udev hot-plug events let a reconnect retry as soon as a device appears
+    import pyudev
+    PYUDEV_AVAILABLE = True
+except ImportError:
+    PYUDEV_AVAILABLE = False
+
+# Event types checked for every event, bound once instead of looked up on ecodes each time
+EV_SYN = ecodes.EV_SYN
+EV_KEY = ecodes.EV_KEY
+EV_ABS = ecodes.EV_ABS
+
+# struct input_event from linux/input.h: timeval (two C longs), type, code, value.
+# Events are decoded straight from the device fd, without evdev's InputEvent objects
+EVENT_FORMAT = 'llHHi'
+EVENT_SIZE = struct.calcsize(EVENT_FORMAT)
+READ_BATCH = 64  # events read per os.read(), more queued events wake the selector again
+
+# Kinds of analog inputs, decides which setter scales the raw value
+AXIS_STICK = 0
+AXIS_TRIGGER = 1
+AXIS_DPAD = 2
+
+# Slots of the analog values in XboxController.axes
+SLOT_LX = 0  # LeftJoystickX
+SLOT_LY = 1  # LeftJoystickY
+SLOT_RX = 2  # RightJoystickX
+SLOT_RY = 3  # RightJoystickY
+SLOT_LT = 4  # LeftTrigger
+SLOT_RT = 5  # RightTrigger
+SLOT_DPAD_X = 6
+SLOT_DPAD_Y = 7
+NUM_AXES = 8
+
+# Bits of the buttons in XboxController.buttons
+BUTTON_A = 0
+BUTTON_B = 1
+BUTTON_X = 2
+BUTTON_Y = 3
+BUTTON_LB = 4  # LeftBumper
+BUTTON_RB = 5  # RightBumper
+BUTTON_LTHUMB = 6
+BUTTON_RTHUMB = 7
+BUTTON_BACK = 8
+BUTTON_START = 9
+NUM_BUTTONS = 10
+BUTTON_A_MASK = 1 << BUTTON_A
+BUTTON_B_MASK = 1 << BUTTON_B
+
+# Everything XboxController.read() returns, fields are read as state.LeftJoystickX etc.
+ControllerState = namedtuple('ControllerState', [
+    'LeftJoystickY', 'LeftJoystickX', 'RightJoystickY', 'RightJoystickX',
+    'LeftTrigger', 'RightTrigger', 'LeftBumper', 'RightBumper',
+    'A', 'X', 'Y', 'B', 'LeftThumb', 'RightThumb', 'Back', 'Start',
+    'DPadY', 'DPadX', 'Connected'
+])
 
 class XboxController:
     """
@@ -11,11 +73,18 @@ class XboxController:
 
     Features:
     - Precise joystick mapping with proper center position at 0
-    - Dead zone handling for accurate stick positions
+    - Dead zone handling for accurate stick positions, without a jump at its edge
     - Automatic reconnection on disconnects
     - Full 16-bit precision for smooth control
     - Complete button and axis mapping
     - Thread-safe monitoring
+
+    The monitor thread is the only writer of the axes (float32) array, indexed
+    by the SLOT_* constants, and of buttons, an int with one bit per BUTTON_*
+    constant. Readers use them directly or through snapshot_into(), without
+    locking, several buttons can be tested at once with a mask. Each batch of
+    events is written between two increments of a sequence counter (a seqlock),
+    so snapshot_into() never returns half of a batch.
     """
 
     # Controller constants
@@ -25,150 +94,235 @@ class XboxController:
     TRIGGER_MAX = 1024  # Maximum value for triggers
     CENTER_TOLERANCE = 350  # Dead zone size around center position
     MAX_RECONNECT_ATTEMPTS = 5
+    # Real-time scheduling of the monitor thread, set to None to leave it to the OS.
+    # Works best with the core kept free of other tasks (isolcpus=3 on the kernel command line)
+    MONITOR_CPU = 3  # the Pi's last core
+    MONITOR_PRIORITY = 50  # SCHED_FIFO priority, needs root or CAP_SYS_NICE
+
+    # Scale factors precomputed so axis events only multiply
+    INV_HALF_STICK = 2.0 / STICK_MAX
+    STICK_DEADZONE = CENTER_TOLERANCE * INV_HALF_STICK  # CENTER_TOLERANCE on the -1..1 scale
+    STICK_DEADZONE_SCALE = 1.0 / (1.0 - STICK_DEADZONE)  # stretches the rest of the range back to -1..1
+    INV_TRIGGER_MAX = 1.0 / TRIGGER_MAX
+
+    # Fixed attribute layout, attribute reads in the event path skip the instance dict
+    __slots__ = (
+        '_monitor_thread', '_stop', '_connected', '_reconnect_count', '_device',
+        '_wake_r', '_wake_w', '_selector', '_last_path', '_udev_monitor',
+        'axes', 'buttons', '_presses', '_press_lock', '_axis_signs', '_signed_axes', '_seq',
+        'button_map', 'trigger_flip', 'axis_map', '_axis_handlers'
+    )
 
     def __init__(self):
         """Initialize the controller interface."""
         self._monitor_thread = None
-        self._stop_event = threading.Event()
+        # Stop flag of the monitor thread. A plain bool needs no lock, and the
+        # wake pipe makes sure a sleeping thread sees it right away
+        self._stop = False
         self._connected = False
         self._reconnect_count = 0
         self._device = None
 
-        # Initialize controller values
-        self.reset_values()
+        # The monitor thread sleeps in the selector on the device and this pipe,
+        # stop_monitoring() writes to the pipe to wake it up immediately
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+
+        # Device node the controller was last found at, tried first on reconnect
+        self._last_path = None
+        # Input hot-plug events, watched while waiting to reconnect
+        self._udev_monitor = None
+        if PYUDEV_AVAILABLE:
+            try:
+                self._udev_monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+                self._udev_monitor.filter_by('input')
+                self._udev_monitor.start()
+            except (ImportError, OSError):  # libudev missing or no netlink access
+                self._udev_monitor = None
+
+        # Controller values: joysticks -1 to 1, triggers 0 to 1, D-pad -1, 0 or 1
+        self.axes = np.zeros(NUM_AXES, dtype=np.float32)
+        # Button states, bit BUTTON_* is set while that button is held
+        self.buttons = 0
+        # Presses not yet taken with take_edge(). Set by the monitor thread and
+        # cleared by readers, so both sides hold the lock (taken only on presses)
+        self._presses = np.zeros(NUM_BUTTONS, dtype=np.int8)
+        self._press_lock = threading.Lock()
+        # Sign of each axis in snapshot_into(), triggers flip while their bumper is held
+        self._axis_signs = np.ones(NUM_AXES, dtype=np.float32)
+        self._signed_axes = np.zeros(NUM_AXES, dtype=np.float32)
+        # Odd while the monitor thread is writing a batch of events
+        self._seq = 0
+
+        # Mapping for buttons: bit
+        self.button_map = {
+            ecodes.BTN_SOUTH: BUTTON_A,
+            ecodes.BTN_NORTH: BUTTON_Y,
+            ecodes.BTN_WEST: BUTTON_X,
+            ecodes.BTN_EAST: BUTTON_B,
+            ecodes.BTN_TL: BUTTON_LB,
+            ecodes.BTN_TR: BUTTON_RB,
+            ecodes.BTN_THUMBL: BUTTON_LTHUMB,
+            ecodes.BTN_THUMBR: BUTTON_RTHUMB,
+            ecodes.BTN_SELECT: BUTTON_BACK,
+            ecodes.BTN_START: BUTTON_START
+        }
+
+        # Bumper held -> trigger that becomes negative
+        self.trigger_flip = {
+            BUTTON_LB: SLOT_LT,
+            BUTTON_RB: SLOT_RT
+        }
 
-        # Mapping for analog inputs
+        # Mapping for analog inputs: (kind, slot)
         self.axis_map = {
-            ecodes.ABS_X: 'LeftJoystickX',
-            ecodes.ABS_Y: 'LeftJoystickY',
-            ecodes.ABS_BRAKE: 'LeftTrigger',
-            ecodes.ABS_GAS: 'RightTrigger',
-            ecodes.ABS_Z: 'RightJoystickX',
-            ecodes.ABS_RZ: 'RightJoystickY',
-            ecodes.ABS_HAT0X: 'DPadX',
-            ecodes.ABS_HAT0Y: 'DPadY'
+            ecodes.ABS_X: (AXIS_STICK, SLOT_LX),
+            ecodes.ABS_Y: (AXIS_STICK, SLOT_LY),
+            ecodes.ABS_BRAKE: (AXIS_TRIGGER, SLOT_LT),
+            ecodes.ABS_GAS: (AXIS_TRIGGER, SLOT_RT),
+            ecodes.ABS_Z: (AXIS_STICK, SLOT_RX),
+            ecodes.ABS_RZ: (AXIS_STICK, SLOT_RY),
+            ecodes.ABS_HAT0X: (AXIS_DPAD, SLOT_DPAD_X),  # -1 left, +1 right
+            ecodes.ABS_HAT0Y: (AXIS_DPAD, SLOT_DPAD_Y)   # -1 up, +1 down
+        }
+
+        # Event code -> setter with the slot already bound, so an axis event
+        # needs one lookup and one call
+        setters = {
+            AXIS_STICK: self._set_stick,
+            AXIS_TRIGGER: self._set_trigger,
+            AXIS_DPAD: self._set_dpad
         }
+        self._axis_handlers = {code: partial(setters[kind], slot) for code, (kind, slot) in self.axis_map.items()}
 
         # Start the monitoring thread
         self.start_monitoring()
 
     def reset_values(self):
-        """Reset all controller values to their defaults."""
-        # Joysticks (-1 to 1)
-        self.LeftJoystickY = 0
-        self.LeftJoystickX = 0
-        self.RightJoystickY = 0
-        self.RightJoystickX = 0
-
-        # Triggers (0 to 1)
-        self.LeftTrigger = 0
-        self.RightTrigger = 0
-
-        # Buttons (0 or 1)
-        self.LeftBumper = 0
-        self.RightBumper = 0
-        self.A = 0
-        self.X = 0
-        self.Y = 0
-        self.B = 0
-        self.LeftThumb = 0
-        self.RightThumb = 0
-        self.Back = 0
-        self.Start = 0
-
-        # D-pad (-1, 0, or 1 for each axis)
-        self.DPadX = 0  # -1 left, +1 right
-        self.DPadY = 0  # -1 up, +1 down
+        """
+        Reset all controller values to their defaults.
+        Called by the monitor thread on disconnect, as one batch for snapshot_into().
+        """
+        self._seq += 1
+        self.axes.fill(0)
+        self.buttons = 0
+        with self._press_lock:
+            self._presses.fill(0)
+        self._axis_signs.fill(1)
+        self._seq += 1
 
     def _find_controller(self):
         """
         Find and return the first available Xbox controller.
         Returns None if no controller is found.
         """
-        devices = [evdev.InputDevice(path) for path in evdev.list_devices()]
-        for device in devices:
-            if "xbox" in device.name.lower():
+        if self._last_path is not None:
+            device = self._open_controller(self._last_path)
+            if device:
+                return device
+
+        for path in evdev.list_devices():
+            if path == self._last_path:
+                continue
+            device = self._open_controller(path)
+            if device:
+                self._last_path = path
                 return device
         return None
 
+    @staticmethod
+    def _open_controller(path):
+        # Open the device at path, returns it if it is an Xbox controller and None otherwise
+        try:
+            device = evdev.InputDevice(path)
+        except OSError:
+            return None
+        if "xbox" in device.name.lower():
+            return device
+        device.close()
+        return None
+
     def start_monitoring(self):
         """Start the controller monitoring thread."""
         if self._monitor_thread is None or not self._monitor_thread.is_alive():
-            self._stop_event.clear()
+            self._stop = False
             self._monitor_thread = threading.Thread(target=self._monitor_controller)
             self._monitor_thread.daemon = True
             self._monitor_thread.start()
 
     def stop_monitoring(self):
         """Stop the controller monitoring thread."""
-        self._stop_event.set()
+        self._stop = True
+        os.write(self._wake_w, b'\0')  # Wake up the thread if it's waiting
         if self._monitor_thread:
             self._monitor_thread.join()
 
-    def _process_event(self, event):
-        if event.type == ecodes.EV_KEY:
-            # Button handling remains unchanged
-            value = 1 if event.value else 0
-
-            if event.code == ecodes.BTN_SOUTH:
-                self.A = value
-            elif event.code == ecodes.BTN_NORTH:
-                self.Y = value
-            elif event.code == ecodes.BTN_WEST:
-                self.X = value
-            elif event.code == ecodes.BTN_EAST:
-                self.B = value
-            elif event.code == ecodes.BTN_TL:
-                self.LeftBumper = value
-            elif event.code == ecodes.BTN_TR:
-                self.RightBumper = value
-            elif event.code == ecodes.BTN_THUMBL:
-                self.LeftThumb = value
-            elif event.code == ecodes.BTN_THUMBR:
-                self.RightThumb = value
-            elif event.code == ecodes.BTN_SELECT:
-                self.Back = value
-            elif event.code == ecodes.BTN_START:
-                self.Start = value
-
-        elif event.type == ecodes.EV_ABS:
-            axis_name = self.axis_map.get(event.code)
-            if not axis_name:
-                return
-
-            if axis_name in ['LeftJoystickX', 'LeftJoystickY', 'RightJoystickX', 'RightJoystickY']:
-                # Print raw value first
-                #print(f"Raw value: {event.value}")
-
-                # Map the full range (0 to STICK_MAX) to -1 to 1
-                # This is a direct linear mapping:
-                # 0 -> -1
-                # STICK_MAX/2 -> 0
-                # STICK_MAX -> 1
-                normalized_value = (event.value / (self.STICK_MAX / 2)) - 1.0
-
-                # Print pre-deadzone value
-                #print(f"Pre-deadzone: {normalized_value}")
-
-                # Apply deadzone
-                if abs(normalized_value) < (self.CENTER_TOLERANCE / (self.STICK_MAX / 2)):
-                    normalized_value = 0
-
-                # Print final value
-                #print(f"Final value: {normalized_value}\n")
-
-                setattr(self, axis_name, normalized_value)
-
-            elif axis_name in ['LeftTrigger', 'RightTrigger']:
-                normalized_value = event.value / self.TRIGGER_MAX
-                setattr(self, axis_name, normalized_value)
-
-            elif axis_name in ['DPadX', 'DPadY']:
-                setattr(self, axis_name, event.value)
+    def _process_event(self, event_type, code, value):
+        if event_type == EV_KEY:
+            bit = self.button_map.get(code)
+            if bit is not None:
+                pressed = 1 if value else 0
+                buttons = self.buttons
+                if pressed and not (buttons >> bit) & 1:
+                    with self._press_lock:
+                        self._presses[bit] = 1
+                self.buttons = (buttons & ~(1 << bit)) | (pressed << bit)
+
+                flipped = self.trigger_flip.get(bit)
+                if flipped is not None:
+                    self._axis_signs[flipped] = -1 if pressed else 1
+
+        elif event_type == EV_ABS:
+            handler = self._axis_handlers.get(code)
+            if handler is not None:
+                handler(value)
+
+    def _set_stick(self, slot, value):
+        # Map the full range (0 to STICK_MAX) to -1 to 1
+        # This is a direct linear mapping:
+        # 0 -> -1
+        # STICK_MAX/2 -> 0
+        # STICK_MAX -> 1
+        normalized_value = value * self.INV_HALF_STICK - 1.0
+
+        # Apply deadzone. Outside of it the distance from the deadzone edge
+        # is rescaled, so the output starts from 0 instead of jumping to the
+        # deadzone size and still reaches -1 and 1 at the ends
+        magnitude = abs(normalized_value)
+        if magnitude < self.STICK_DEADZONE:
+            normalized_value = 0
+        else:
+            normalized_value = math.copysign((magnitude - self.STICK_DEADZONE) * self.STICK_DEADZONE_SCALE,
+                                             normalized_value)
+
+        self.axes[slot] = normalized_value
+
+    def _set_trigger(self, slot, value):
+        self.axes[slot] = value * self.INV_TRIGGER_MAX
+
+    def _set_dpad(self, slot, value):
+        self.axes[slot] = value
+
+    def _set_realtime_scheduling(self):
+        # Pin the calling thread to its own core and run it under SCHED_FIFO, so
+        # other processes can't delay it when events arrive. Optional, failures only print
+        if self.MONITOR_CPU is not None:
+            try:
+                os.sched_setaffinity(0, {self.MONITOR_CPU})
+            except (AttributeError, OSError) as e:
+                print(f"[JOYSTICK] Could not pin the monitor thread to CPU {self.MONITOR_CPU}: {e}")
+        if self.MONITOR_PRIORITY is not None:
+            try:
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.MONITOR_PRIORITY))
+            except (AttributeError, OSError) as e:
+                print(f"[JOYSTICK] Could not use real-time scheduling for the monitor thread: {e}")
 
     def _monitor_controller(self):
         """Monitor controller events and handle disconnections."""
-        while not self._stop_event.is_set():
+        self._set_realtime_scheduling()
+        while not self._stop:
             try:
                 if not self._device:
                     self._device = self._find_controller()
@@ -178,11 +332,49 @@ class XboxController:
                 self._connected = True
                 self._reconnect_count = 0
 
-                for event in self._device.read_loop():
-                    if event.type != ecodes.EV_SYN:
-                        self._process_event(event)
-                    if self._stop_event.is_set():
-                        break
+                # Sleep until events are queued, then drain them with one os.read()
+                # instead of a read per event like read_loop() does
+                device_fd = self._device.fd
+                # Bound once for the per-event loop. The stop flag is not, it must be re-read
+                select = self._selector.select
+                process_event = self._process_event
+                axis_handler = self._axis_handlers.get
+                ev_syn = EV_SYN
+                ev_abs = EV_ABS
+                read_size = EVENT_SIZE * READ_BATCH
+                # Newest value of each axis in the current packet. A packet ends with
+                # EV_SYN and only its final values are visible, so earlier ones are skipped
+                pending_abs = {}
+                self._selector.register(device_fd, selectors.EVENT_READ)
+                try:
+                    while not self._stop:
+                        for key, _ in select():
+                            if key.fd != device_fd:
+                                os.read(self._wake_r, 4096)  # woken by stop_monitoring()
+                                continue
+                            self._seq += 1
+                            try:
+                                data = os.read(device_fd, read_size)
+                                if not data:
+                                    raise OSError("Controller device closed")
+                                for _, _, event_type, code, value in struct.iter_unpack(EVENT_FORMAT, data):
+                                    if event_type == ev_abs:
+                                        pending_abs[code] = value
+                                    elif event_type == ev_syn:
+                                        if pending_abs:
+                                            for code, value in pending_abs.items():
+                                                handler = axis_handler(code)
+                                                if handler is not None:
+                                                    handler(value)
+                                            pending_abs.clear()
+                                    else:
+                                        process_event(event_type, code, value)
+                            except BlockingIOError:
+                                pass  # woken without anything to read
+                            finally:
+                                self._seq += 1
+                finally:
+                    self._selector.unregister(device_fd)
 
             except (OSError, IOError):
                 if self._connected:
@@ -190,60 +382,133 @@ class XboxController:
                     self._connected = False
                     self.reset_values()
                 if not self._attempt_reconnect():
-                    print("[ERROR] Maximum reconnection attempts reached.")
-                    self._stop_event.set()
+                    if not self._stop:
+                        print("[ERROR] Maximum reconnection attempts reached.")
+                    self._stop = True
                     break
 
     def _attempt_reconnect(self):
-        """Attempt to reconnect to the controller."""
+        """
+        Attempt to reconnect to the controller. An attempt only counts once its
+        wait times out, input hot-plug events in between just trigger another scan.
+        """
         wait_delay = 3
-        while not self._stop_event.is_set() and self._reconnect_count < self.MAX_RECONNECT_ATTEMPTS:
-            try:
-                self._device = self._find_controller()
-                if self._device:
-                    print("[JOYSTICK] Controller reconnected successfully!")
-                    self._connected = True
-                    return True
-            except OSError:
+        udev_monitor = self._udev_monitor
+        if udev_monitor is not None:
+            # Events queued while the controller was connected, its own removal
+            # included, are stale and must not cut the first wait short
+            while udev_monitor.poll(timeout=0) is not None:
                 pass
+            self._selector.register(udev_monitor.fileno(), selectors.EVENT_READ)
+        try:
+            while not self._stop and self._reconnect_count < self.MAX_RECONNECT_ATTEMPTS:
+                if self._try_connect():
+                    return True
 
-            self._reconnect_count += 1
-            remaining = self.MAX_RECONNECT_ATTEMPTS - self._reconnect_count
-            print(f"[JOYSTICK] Reconnection attempt {self._reconnect_count}/{self.MAX_RECONNECT_ATTEMPTS} "
-                  f"failed. {remaining} attempts remaining. "
-                  f"Retrying in {wait_delay} seconds...")
-            time.sleep(wait_delay)
+                remaining = self.MAX_RECONNECT_ATTEMPTS - self._reconnect_count - 1
+                print(f"[JOYSTICK] Reconnection attempt {self._reconnect_count + 1}/{self.MAX_RECONNECT_ATTEMPTS} "
+                      f"failed. {remaining} attempts remaining. "
+                      f"Retrying in {wait_delay} seconds...")
+                # Wait like time.sleep(), but return early if stop_monitoring() is called
+                # and scan again whenever an input device is plugged in
+                deadline = time.monotonic() + wait_delay
+                while not self._stop:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    plugged = False
+                    for key, _ in self._selector.select(timeout=timeout):
+                        if key.fd == self._wake_r:
+                            os.read(self._wake_r, 4096)
+                        else:
+                            while udev_monitor.poll(timeout=0) is not None:
+                                pass  # only the wakeup matters, the scan finds the device
+                            plugged = True
+                    if plugged and not self._stop and self._try_connect():
+                        return True
+                self._reconnect_count += 1
+            return False
+        finally:
+            if udev_monitor is not None:
+                self._selector.unregister(udev_monitor.fileno())
+
+    def _try_connect(self):
+        # Scan for the controller once, returns True if it was found
+        try:
+            self._device = self._find_controller()
+        except OSError:
+            return False
+        if self._device:
+            print("[JOYSTICK] Controller reconnected successfully!")
+            self._connected = True
+            return True
         return False
 
     def read(self):
         """
         Read the current state of all controller inputs.
-        Returns a dictionary containing all controller values.
+        Returns a ControllerState with all controller values and whether the
+        controller is connected. The values are all zero while it is disconnected.
         """
-        if not self._connected:
+        connected = self._connected
+        if not connected:
+            # The monitor thread already reset the values when the controller went away
             print("[Warning] Controller not connected! (press any button to connect)")
-            self.reset_values()
-
-        return {
-            'LeftJoystickY': self.LeftJoystickY,
-            'LeftJoystickX': self.LeftJoystickX,
-            'RightJoystickY': self.RightJoystickY,
-            'RightJoystickX': self.RightJoystickX,
-            'LeftTrigger': self.LeftTrigger,
-            'RightTrigger': self.RightTrigger,
-            'LeftBumper': self.LeftBumper,
-            'RightBumper': self.RightBumper,
-            'A': self.A,
-            'X': self.Y, # flipped
-            'Y': self.X, # flipped
-            'B': self.B,
-            'LeftThumb': self.LeftThumb,
-            'RightThumb': self.RightThumb,
-            'Back': self.Back,
-            'Start': self.Start,
-            'DPadY': self.DPadY,    # these need to be flipped for some reason
-            'DPadX': self.DPadX     # these need to be flipped for some reason
-        }
+
+        axes = self.axes.tolist()
+        buttons = self.buttons
+        return ControllerState(
+            axes[SLOT_LY],
+            axes[SLOT_LX],
+            axes[SLOT_RY],
+            axes[SLOT_RX],
+            axes[SLOT_LT],
+            axes[SLOT_RT],
+            (buttons >> BUTTON_LB) & 1,
+            (buttons >> BUTTON_RB) & 1,
+            (buttons >> BUTTON_A) & 1,
+            (buttons >> BUTTON_Y) & 1, # X, flipped
+            (buttons >> BUTTON_X) & 1, # Y, flipped
+            (buttons >> BUTTON_B) & 1,
+            (buttons >> BUTTON_LTHUMB) & 1,
+            (buttons >> BUTTON_RTHUMB) & 1,
+            (buttons >> BUTTON_BACK) & 1,
+            (buttons >> BUTTON_START) & 1,
+            axes[SLOT_DPAD_Y],    # these need to be flipped for some reason
+            axes[SLOT_DPAD_X],    # these need to be flipped for some reason
+            connected
+        )
+
+    def snapshot_into(self, out, slots):
+        """
+        Copy the axes listed in slots (array of SLOT_* values) into the float32
+        array out, in that order. Triggers are negative while their bumper is
+        held, so each one covers -1 to 1. Nothing is allocated, for use in
+        control loops.
+        """
+        while True:
+            seq = self._seq
+            if not seq & 1:
+                np.multiply(self.axes, self._axis_signs, out=self._signed_axes)
+                np.take(self._signed_axes, slots, out=out)
+                if self._seq == seq:
+                    return out
+            # A batch is being written, let the monitor thread finish it
+            time.sleep(0)
+
+    def button(self, button):
+        """Return 1 while the button (BUTTON_* bit) is held, 0 otherwise."""
+        return (self.buttons >> button) & 1
+
+    def take_edge(self, button):
+        """
+        Return True once for every press of the button (BUTTON_* bit) since
+        the last call. Presses are latched, so short ones between reads are not missed.
+        """
+        with self._press_lock:
+            pressed = self._presses[button]
+            self._presses[button] = 0
+        return bool(pressed)
 
     def is_connected(self):
         """Check if the controller is currently connected."""
@@ -263,8 +528,8 @@ if __name__ == "__main__":
     try:
         while True:
             state = controller.read()
-            # print(f"Left stick: X={state['LeftJoystickX']:.2f}, Y={state['LeftJoystickY']:.2f}")
-            #print(f"Left trigger: {state['LeftTrigger']:.2f}")
+            # print(f"Left stick: X={state.LeftJoystickX:.2f}, Y={state.LeftJoystickY:.2f}")
+            #print(f"Left trigger: {state.LeftTrigger:.2f}")
             print(state)
             time.sleep(0.1)
     except KeyboardInterrupt:
@@ -3,79 +3,82 @@
 import control_modules.PWM_controller as PWM_controller
 # import joystick module (evdev-version)
 import control_modules.joystick_evdev as joystick_module
-#import time for sleep
-from time import sleep
+#import time for sleep and the loop deadlines
+from time import sleep, monotonic_ns
+import numpy as np
+
+
+# joystick axes given to the servo controller, in its input order
+CONTROLLER_SLOTS = np.array([
+    joystick_module.SLOT_RX,  # scoop, index 0
+    joystick_module.SLOT_LY,  # lift boom, index 1
+    joystick_module.SLOT_LX,  # rotate cabin, index 2
+    joystick_module.SLOT_RY,  # tilt boom, index 3
+    joystick_module.SLOT_RT,  # track R, index 4
+    joystick_module.SLOT_LT,  # track L, index 5
+])
+
+LOOP_PERIOD_NS = 10_000_000  # 100Hz
+MAX_LATE_PERIODS = 5  # if the loop falls further behind than this, start counting again from now
 
 
 def main(pwm, controller):
     step = 0
+    # filled in place every loop
+    controller_values = np.zeros(len(CONTROLLER_SLOTS), dtype=np.float32)
 
     pwm.print_input_mappings()
     sleep(5)
 
+    # each loop starts one period after the previous one, no matter how long the work took
+    deadline = monotonic_ns() + LOOP_PERIOD_NS
     while True:
 
         if not controller.is_connected():
             # controller not connected, do nothing
             pass
         else:
-            # read all the joystick values
-            joy_values = controller.read()
-            #print(f"joystick values: {joy_values}")
-
-
-            # we should modify the trigger values so that they can be flipped with bumper values
+            # read the joystick values the servo controller needs.
+            # the triggers are flipped while their bumper is pressed
+            controller.snapshot_into(controller_values, CONTROLLER_SLOTS)
 
-            # flip the LeftTrigger and if the LeftBumper is pressed
-            if joy_values['LeftBumper']:
-                joy_values['LeftTrigger'] = -joy_values['LeftTrigger']
 
-            # flip the RightTrigger and if the RightBumper is pressed
-            if joy_values['RightBumper']:
-                joy_values['RightTrigger'] = -joy_values['RightTrigger']
-                
-                
-            if joy_values['A']:
+            if controller.take_edge(joystick_module.BUTTON_A):
                 # example, replace with your own logic
                 # enable tracks with A button
                 pwm.set_tracks(True)
                 
-            if joy_values['B']:
+            if controller.take_edge(joystick_module.BUTTON_B):
                 # example, replace with your own logic
                 # disable tracks with B button
                 pwm.set_tracks(False)
                 
                 
             # example, increa pump stock speed
-            #if joy_values['DPadY']:
+            #if controller.axes[joystick_module.SLOT_DPAD_Y]:
                 #pwm.update_pump(0.01, debug=True)
                 
                 
 
+            # update the servo controller with the new values.
+            # the buffer already has the right length and type, so the array entry point skips the input checks
+            pwm.update_values_array(controller_values)
 
-            # map the joystick values to the servo controller
-            controller_list = [
-                joy_values['RightJoystickX'], # scoop, index 0
-                joy_values['LeftJoystickY'],  # lift boom, index 1
-                joy_values['LeftJoystickX'],  # rotate cabin, index 2
-                joy_values['RightJoystickY'],  # tilt boom, index 3
-                joy_values['RightTrigger'],    # track R, index 4
-                joy_values['LeftTrigger'],   # track L, index 5
-            ]
-
-            #print(f"giving input: {joy_values['LeftJoystickX']}")
-            print(controller_list)
-            # update the servo controller with the new values
-            pwm.update_values(controller_list)
-
-            # print every 20 steps
+            # print every 20 steps, printing every loop would take a good part of the loop time
             if step % 20 == 0:
                 rate = pwm.get_average_input_rate()
-                print(f"average input rate: {rate}")
+                print(f"{controller_values.tolist()}\naverage input rate: {rate}")
                 step = 0
 
         step += 1
-        sleep(0.01) # rough estimate of the loop time (100Hz)
+
+        now = monotonic_ns()
+        if deadline > now:
+            sleep((deadline - now) / 1e9)
+        elif now - deadline > MAX_LATE_PERIODS * LOOP_PERIOD_NS:
+            # too far behind to catch up with back to back loops
+            deadline = now
+        deadline += LOOP_PERIOD_NS
 
 
 if __name__ == '__main__':